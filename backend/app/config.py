@@ -11,15 +11,80 @@ class Settings(BaseSettings):
     
     # Database
     database_url: str = "sqlite:///./pr_reviewer.db"
+    database_async_url: str | None = None  # Defaults to DATABASE_URL with aiosqlite/asyncpg
+    database_pool_size: int = 5
+    database_max_overflow: int = 10
+    database_pool_recycle: int = 1800  # Seconds before a pooled connection is replaced
+    
+    # SQLite tuning (ignored for other databases)
+    sqlite_tuning: bool = True  # WAL, synchronous=NORMAL and the pragmas below on each connection
+    sqlite_busy_timeout_ms: int = 5000  # How long a writer waits for the lock
+    sqlite_cache_size_mb: int = 64  # Page cache per connection
+    sqlite_mmap_size_mb: int = 256
+    sqlite_single_writer: bool = True  # Worker writes go through one thread
     
     # GitHub
     github_token: str | None = None  # Optional for public repos
     github_client_id: str | None = None
     github_client_secret: str | None = None
+    github_max_connections: int = 20
+    github_max_keepalive_connections: int = 10
+    github_keepalive_expiry: float = 30.0  # Seconds an idle connection is kept open
+    github_http2: bool = False  # Requires the optional 'h2' package
+    github_page_concurrency: int = 4  # Pages of a list endpoint fetched at once
+    github_max_concurrent_requests: int = 10  # Per token
+    github_max_retries: int = 3
+    github_retry_backoff: float = 1.0  # Base seconds for jittered exponential backoff
+    github_rate_limit_reserve: int = 50  # Start pacing requests below this many remaining
+    github_rate_limit_max_wait: float = 120.0  # Longest a request will wait for budget
+    github_submit_timeout: float = 5.0  # Head SHA lookup when a PR is submitted; skipped when slower
+    github_cache_enabled: bool = True  # ETag/Last-Modified revalidation of API reads
+    github_cache_max_entries: int = 512  # In-memory LRU size
+    github_cache_max_mb: float = 64  # In-memory LRU budget for response bodies
+    github_cache_max_entry_mb: float = 4  # Larger bodies are only cached in the SQLite tier
+    github_cache_sqlite_path: str | None = None  # Optional persistent tier, e.g. "./github_cache.db"
     
     # LLM/AI settings
     openai_api_key: str | None = None
     llm_model: str = "gpt-4o-mini"
+    llm_prompt_tokens: int = 6000  # Budget for each review prompt (excluding the system prompt)
+    llm_chunk_tokens: int = 4000  # Diff tokens per request, at most what the prompt leaves; larger diffs are reviewed in chunks
+    llm_max_chunks: int = 20  # Diff beyond this many chunks is left out of the LLM review
+    llm_max_concurrency: int = 4  # Completions in flight at once, across all analyses
+    llm_tokens_per_minute: int = 0  # Provider TPM limit to stay under; 0 = unlimited
+    llm_streaming: bool = True  # Stream completions and publish findings as they arrive
+    llm_partial_flush_seconds: float = 1.0  # How often streamed findings are saved
+    
+    # Analysis execution
+    analysis_max_concurrency: int = 2  # CPU-bound stages running at once off the event loop
+    
+    # Heuristic analysis
+    heuristic_scan_workers: int = 4  # Process pool size; 0 keeps scanning in-process
+    heuristic_parallel_threshold: int = 1_000_000  # Added-code chars before fanning out
+    
+    # Per-file heuristic findings cache
+    file_findings_cache_enabled: bool = True  # Reuse scans of byte-identical file changes
+    file_findings_cache_max_entries: int = 50000
+    
+    # Result cache
+    result_cache_enabled: bool = True  # Reuse reviews of unchanged PRs/diffs
+    result_cache_ttl_seconds: int = 86400
+    result_cache_max_entries: int = 10000
+    
+    # Job queue / workers
+    embedded_worker: bool = True  # Run a worker inside the API process
+    worker_concurrency: int = 2  # Analyses a worker runs at once
+    worker_poll_interval: float = 1.0  # Seconds between polls when the queue is empty
+    job_max_attempts: int = 3
+    job_lease_seconds: int = 900  # A running job is requeued if its worker goes quiet this long
+    
+    # Run progress events
+    event_broker: str = "memory"  # Or "module:Class" of an EventBroker subclass
+    run_events_poll_seconds: float = 5.0  # Database re-check (and keepalive) while a stream is idle
+    
+    # Blob store for uploaded diffs and stored reviews
+    blob_store: str = "database"  # Or "filesystem"
+    blob_store_path: str = "./blobs"  # Directory for the filesystem store
     
     # Redis (optional for background tasks)
     redis_url: str | None = None
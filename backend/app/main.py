@@ -3,17 +3,49 @@ from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
 
 from .config import get_settings
-from .models import Base, engine
+from .models import engine, init_db
+from .models.database import get_async_engine
 from .routers import analyze_router, github_router, health_router
+from .services.executors import shutdown_executors
+from .services.github import create_github_client
+from .services.http_cache import create_response_cache
+from .services.llm import create_llm_client
+from .services.rate_limit import GitHubRateLimiter
+from .worker import Worker
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     """Application lifespan handler."""
-    # Startup: Create database tables
-    Base.metadata.create_all(bind=engine)
+    # Startup: Create database tables, adding columns new since an older version
+    init_db(engine)
+    # One pooled GitHub client for the lifetime of the app
+    app.state.github_client = create_github_client()
+    app.state.github_cache = create_response_cache()
+    app.state.github_rate_limiter = GitHubRateLimiter.from_settings()
+    # One pooled, rate-limited LLM client (None without an API key)
+    app.state.llm_client = create_llm_client()
+    # Process queued analyses in-process unless dedicated workers are deployed
+    app.state.worker = None
+    if get_settings().embedded_worker:
+        app.state.worker = Worker(
+            client=app.state.github_client,
+            cache=app.state.github_cache,
+            rate_limiter=app.state.github_rate_limiter,
+            llm=app.state.llm_client,
+        )
+        app.state.worker.start()
     yield
-    # Shutdown: cleanup if needed
+    # Shutdown: stop the worker, close connections and stop worker pools
+    if app.state.worker is not None:
+        await app.state.worker.stop()
+    await app.state.github_client.aclose()
+    if app.state.llm_client is not None:
+        await app.state.llm_client.aclose()
+    if app.state.github_cache is not None:
+        app.state.github_cache.close()
+    await get_async_engine().dispose()
+    shutdown_executors()
 
 
 def create_app() -> FastAPI:
@@ -1,5 +1,8 @@
-from .database import Base, get_db, engine
-from .analysis import AnalysisRun, AnalysisResult
+from .database import Base, get_db, get_async_db, engine
+from .analysis import AnalysisRun, AnalysisResult, FileFindings
+from .blob import Blob
+from .job import AnalysisJob
+from .schema import init_db, upgrade_schema
 from .user import User
 
-__all__ = ["Base", "get_db", "engine", "AnalysisRun", "AnalysisResult", "User"]
+__all__ = ["Base", "get_db", "get_async_db", "engine", "AnalysisRun", "AnalysisResult", "FileFindings", "Blob", "AnalysisJob", "User", "init_db", "upgrade_schema"]
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, JSON
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, JSON, Boolean, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from enum import Enum
@@ -19,18 +19,32 @@ class AnalysisRun(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
-    repo = Column(String, index=True)  # e.g., "owner/repo"
+    repo = Column(String)  # e.g., "owner/repo"; indexed by ix_analysis_runs_repo_created_at_id
     pr_number = Column(Integer, nullable=True)
     pr_url = Column(String, nullable=True)
-    diff_text = Column(Text, nullable=True)  # For uploaded diffs
+    diff_blob = Column(String, nullable=True)  # Uploaded diff, in the blob store
+    diff_text = Column(Text, nullable=True)  # Uploaded diffs from before the blob store
+    head_sha = Column(String, nullable=True)  # PR head that was analyzed
+    options_hash = Column(String, nullable=True)  # See services.coalescing.options_hash
+    # Set while the run is pending/processing so identical submissions attach
+    # to it; cleared when it finishes. Unique, so only one can be in flight.
+    inflight_key = Column(String, nullable=True, unique=True)
     status = Column(String, default=AnalysisStatus.PENDING)
     error_message = Column(Text, nullable=True)
+    partial_findings = Column(JSON, nullable=True)  # Streamed so far, while processing
     created_at = Column(DateTime, default=datetime.utcnow)
     completed_at = Column(DateTime, nullable=True)
     
     # Relationships
     user = relationship("User", back_populates="analysis_runs")
     result = relationship("AnalysisResult", back_populates="run", uselist=False)
+    
+    # Keyset pagination of GET /api/runs, newest first, optionally filtered
+    __table_args__ = (
+        Index("ix_analysis_runs_created_at_id", "created_at", "id"),
+        Index("ix_analysis_runs_repo_created_at_id", "repo", "created_at", "id"),
+        Index("ix_analysis_runs_status_created_at_id", "status", "created_at", "id"),
+    )
 
 
 class AnalysisResult(Base):
@@ -40,10 +54,24 @@ class AnalysisResult(Base):
     
     id = Column(Integer, primary_key=True, index=True)
     run_id = Column(Integer, ForeignKey("analysis_runs.id"), unique=True)
-    result_json = Column(JSON)  # The full structured review output
+    result_blob = Column(String, nullable=True)  # Review and markdown JSON, in the blob store
+    result_json = Column(JSON, nullable=True)  # Inline output of results from before the blob store
     model_version = Column(String, nullable=True)  # e.g., "gpt-4o-mini"
     rules_version = Column(String, nullable=True)  # Version of rules used
+    cache_key = Column(String, nullable=True, index=True)  # What was reviewed; see ResultCache
+    cache_hit = Column(Boolean, default=False)  # Copied from an earlier identical analysis
     created_at = Column(DateTime, default=datetime.utcnow)
     
     # Relationships
     run = relationship("AnalysisRun", back_populates="result")
+
+
+class FileFindings(Base):
+    """Heuristic scan matches for one file's added lines, reused across runs."""
+    
+    __tablename__ = "file_findings"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    cache_key = Column(String, unique=True, index=True)  # See FileFindingsCache.key
+    matches = Column(JSON)  # [rule index, start, end, text], offsets relative to the file
+    created_at = Column(DateTime, default=datetime.utcnow)
@@ -0,0 +1,15 @@
+from sqlalchemy import Column, Integer, String, DateTime, LargeBinary
+from datetime import datetime
+from .database import Base
+
+
+class Blob(Base):
+    """Compressed content stored once per SHA-256, for the database blob store."""
+    
+    __tablename__ = "blobs"
+    
+    key = Column(String(64), primary_key=True)  # SHA-256 of the uncompressed content
+    codec = Column(String, nullable=False)  # "zstd" or "gzip"
+    size = Column(Integer, nullable=False)  # Uncompressed bytes
+    data = Column(LargeBinary, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
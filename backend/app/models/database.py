@@ -1,14 +1,62 @@
-from sqlalchemy import create_engine
+from functools import lru_cache
+
+from sqlalchemy import create_engine, event, make_url
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 from ..config import get_settings
 
 settings = get_settings()
 
+# Async driver used for each backend when DATABASE_ASYNC_URL is not set
+ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg"}
+
+
+def is_sqlite(database_url: str) -> bool:
+    return make_url(database_url).get_backend_name() == "sqlite"
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record):
+    """
+    Per-connection SQLite settings for concurrent use: WAL lets readers run
+    alongside a writer, and writers wait for the lock instead of failing
+    with "database is locked".
+    """
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")  # Durable across app crashes, not power loss
+    cursor.execute(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}")
+    cursor.execute(f"PRAGMA cache_size=-{int(settings.sqlite_cache_size_mb) * 1024}")
+    cursor.execute(f"PRAGMA mmap_size={int(settings.sqlite_mmap_size_mb) * 1024 * 1024}")
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+
+def _tune_sqlite(sync_engine):
+    if sync_engine.dialect.name == "sqlite" and settings.sqlite_tuning:
+        event.listen(sync_engine, "connect", _apply_sqlite_pragmas)
+
+
+def _engine_options(database_url: str) -> dict:
+    """Connection pool options from Settings (in-memory SQLite has no real pool)."""
+    if "sqlite" in database_url and ":memory:" in database_url:
+        return {}
+    return {
+        "pool_size": settings.database_pool_size,
+        "max_overflow": settings.database_max_overflow,
+        "pool_recycle": settings.database_pool_recycle,
+        "pool_pre_ping": True,
+    }
+
+
+# One engine (and connection pool) per process, shared by request handlers
+# and background analysis tasks
 engine = create_engine(
     settings.database_url,
-    connect_args={"check_same_thread": False} if "sqlite" in settings.database_url else {}
+    connect_args={"check_same_thread": False} if "sqlite" in settings.database_url else {},
+    **_engine_options(settings.database_url),
 )
+_tune_sqlite(engine)
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
@@ -22,3 +70,44 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def async_database_url() -> str:
+    """DATABASE_ASYNC_URL, or DATABASE_URL switched to its async driver."""
+    if settings.database_async_url:
+        return settings.database_async_url
+    url = make_url(settings.database_url)
+    driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    if driver:
+        url = url.set(drivername=f"{url.get_backend_name()}+{driver}")
+    return url.render_as_string(hide_password=False)
+
+
+@lru_cache()
+def get_async_engine() -> AsyncEngine:
+    """
+    Engine for request handlers, so database round-trips don't block the
+    event loop. Created on first use: scripts and workers that only use
+    the sync engine don't need the async drivers installed.
+    """
+    url = async_database_url()
+    async_engine = create_async_engine(url, **_engine_options(url))
+    _tune_sqlite(async_engine.sync_engine)
+    return async_engine
+
+
+@lru_cache()
+def _async_sessionmaker() -> async_sessionmaker[AsyncSession]:
+    # Handlers read objects after committing them
+    return async_sessionmaker(get_async_engine(), autoflush=False, expire_on_commit=False)
+
+
+def AsyncSessionLocal() -> AsyncSession:
+    """A new async session, the counterpart of SessionLocal()."""
+    return _async_sessionmaker()()
+
+
+async def get_async_db():
+    """Dependency that provides an async database session."""
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,32 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey, Text, JSON
+from sqlalchemy.orm import relationship
+from datetime import datetime
+from enum import Enum
+from .database import Base
+
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+
+class AnalysisJob(Base):
+    """Durable queue entry for an analysis run, claimed by workers."""
+    
+    __tablename__ = "analysis_jobs"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    run_id = Column(Integer, ForeignKey("analysis_runs.id"), unique=True)
+    payload = Column(JSON)  # The AnalyzeRequest the run was submitted with
+    status = Column(String, default=JobStatus.QUEUED, index=True)
+    attempts = Column(Integer, default=0)
+    available_at = Column(DateTime, default=datetime.utcnow, index=True)  # Not claimable before this
+    locked_by = Column(String, nullable=True)  # Worker id holding the lease
+    locked_at = Column(DateTime, nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    
+    # Relationships
+    run = relationship("AnalysisRun")
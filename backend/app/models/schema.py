@@ -0,0 +1,54 @@
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.schema import CreateIndex
+
+from .database import Base
+
+
+def upgrade_schema(bind: Engine) -> list[str]:
+    """
+    Bring tables created by an older version up to the current models.
+
+    create_all() only creates missing tables, so columns and indexes added
+    to existing ones since are added here. Only additive changes are made:
+    new columns are nullable, and a unique column gets a unique index
+    (SQLite can't add a column with a UNIQUE constraint). Returns what was
+    changed.
+    """
+    inspector = inspect(bind)
+    quote = bind.dialect.identifier_preparer.quote
+    changes = []
+    with bind.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            columns = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in columns:
+                    continue
+                conn.execute(text(
+                    f"ALTER TABLE {quote(table.name)} ADD COLUMN {quote(column.name)} "
+                    f"{column.type.compile(dialect=bind.dialect)}"
+                ))
+                changes.append(f"added column {table.name}.{column.name}")
+                if column.unique:
+                    name = f"uq_{table.name}_{column.name}"
+                    conn.execute(text(
+                        f"CREATE UNIQUE INDEX IF NOT EXISTS {quote(name)} "
+                        f"ON {quote(table.name)} ({quote(column.name)})"
+                    ))
+                    changes.append(f"added index {name}")
+
+            indexes = {index["name"] for index in inspector.get_indexes(table.name)}
+            for index in table.indexes:
+                if index.name not in indexes:
+                    conn.execute(CreateIndex(index, if_not_exists=True))
+                    changes.append(f"added index {index.name}")
+    return changes
+
+
+def init_db(bind: Engine):
+    """Create missing tables and upgrade existing ones. Called on startup."""
+    Base.metadata.create_all(bind=bind)
+    for change in upgrade_schema(bind):
+        print(f"Schema upgrade: {change}")
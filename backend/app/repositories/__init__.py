@@ -0,0 +1,3 @@
+from .runs import RunRepository, get_run_repository
+
+__all__ = ["RunRepository", "get_run_repository"]
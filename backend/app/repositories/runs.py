@@ -0,0 +1,109 @@
+from datetime import datetime
+from typing import Optional
+
+from fastapi import Depends
+from sqlalchemy import select, tuple_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import defer, joinedload, load_only
+
+from ..models import get_async_db
+from ..models.analysis import AnalysisRun, AnalysisResult
+from ..services.blob_store import load_result_json
+
+# What a status read needs; the large diff_text and partial_findings columns
+# and the result are left unloaded
+STATUS_COLUMNS = (
+    AnalysisRun.id,
+    AnalysisRun.status,
+    AnalysisRun.repo,
+    AnalysisRun.pr_number,
+    AnalysisRun.pr_url,
+    AnalysisRun.created_at,
+    AnalysisRun.completed_at,
+    AnalysisRun.error_message,
+)
+
+
+class RunRepository:
+    """
+    Reads of analysis runs for the API, each loading only the columns and
+    relationships its caller uses. Unloaded attributes raise on access
+    instead of lazy loading, which an AsyncSession can't do implicitly.
+    """
+
+    def __init__(self, db: AsyncSession):
+        self.db = db
+
+    async def get_status(self, run_id: int) -> Optional[AnalysisRun]:
+        """The run's status columns only."""
+        return await self.db.scalar(
+            select(AnalysisRun)
+            .options(load_only(*STATUS_COLUMNS, raiseload=True))
+            .where(AnalysisRun.id == run_id)
+        )
+
+    async def get_progress(self, run_id: int) -> Optional[AnalysisRun]:
+        """The run's status columns and its partial findings."""
+        return await self.db.scalar(
+            select(AnalysisRun)
+            .options(load_only(*STATUS_COLUMNS, AnalysisRun.partial_findings, raiseload=True))
+            .where(AnalysisRun.id == run_id)
+        )
+
+    async def get_with_result(self, run_id: int) -> Optional[AnalysisRun]:
+        """The run with `run.result` loaded in the same query; diff_text is not loaded."""
+        return await self.db.scalar(
+            select(AnalysisRun)
+            .options(
+                defer(AnalysisRun.diff_text, raiseload=True),
+                defer(AnalysisRun.diff_blob, raiseload=True),
+                joinedload(AnalysisRun.result),
+            )
+            .where(AnalysisRun.id == run_id)
+        )
+
+    async def load_result_json(self, result: AnalysisResult) -> dict:
+        """The review and markdown stored for a result."""
+        return await self.db.run_sync(load_result_json, result)
+
+    async def get_inflight(self, key: Optional[str]) -> Optional[AnalysisRun]:
+        """The pending/processing run for an analysis key, if any."""
+        if key is None:
+            return None
+        return await self.db.scalar(
+            select(AnalysisRun)
+            .options(load_only(*STATUS_COLUMNS, raiseload=True))
+            .where(AnalysisRun.inflight_key == key)
+        )
+
+    async def list_page(
+        self,
+        limit: int,
+        after: Optional[tuple[datetime, int]] = None,
+        repo: Optional[str] = None,
+        status: Optional[str] = None,
+        created_after: Optional[datetime] = None,
+        created_before: Optional[datetime] = None,
+    ) -> list[AnalysisRun]:
+        """
+        Up to `limit` runs newest first, status columns only, continuing
+        after the (created_at, id) position `after`.
+        """
+        query = select(AnalysisRun).options(load_only(*STATUS_COLUMNS, raiseload=True))
+        if repo:
+            query = query.where(AnalysisRun.repo == repo)
+        if status:
+            query = query.where(AnalysisRun.status == status)
+        if created_after:
+            query = query.where(AnalysisRun.created_at >= created_after)
+        if created_before:
+            query = query.where(AnalysisRun.created_at < created_before)
+        if after:
+            query = query.where(tuple_(AnalysisRun.created_at, AnalysisRun.id) < after)
+        query = query.order_by(AnalysisRun.created_at.desc(), AnalysisRun.id.desc()).limit(limit)
+        return list((await self.db.scalars(query)).all())
+
+
+def get_run_repository(db: AsyncSession = Depends(get_async_db)) -> RunRepository:
+    """Dependency that provides a RunRepository on the request's session."""
+    return RunRepository(db)
@@ -1,103 +1,45 @@
-from fastapi import APIRouter, HTTPException, BackgroundTasks, Depends
-from sqlalchemy.orm import Session
+import asyncio
+import json
 from datetime import datetime
+from typing import Any, AsyncIterator, Optional
+
+from fastapi import APIRouter, HTTPException, Depends, Query, WebSocket, WebSocketDisconnect
+from fastapi.responses import StreamingResponse
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
 
 from ..schemas.analysis import (
     AnalyzeRequest,
     AnalyzeResponse,
     RunStatusResponse,
+    RunListResponse,
     AnalysisResultResponse,
+    StructuredReview,
 )
-from ..models import get_db, AnalysisRun, AnalysisResult
+from ..config import get_settings
+from ..models import get_async_db, AnalysisRun
 from ..models.analysis import AnalysisStatus
-from ..services.github import GitHubService
+from ..models.database import AsyncSessionLocal
+from ..repositories import RunRepository, get_run_repository
 from ..services.analyzer import AnalyzerService
+from ..services.blob_store import get_blob_store, prepare_blob
+from ..services.coalescing import analysis_key, options_hash, result_cache_key
+from ..services.events import get_event_broker
+from ..services.executors import run_cpu_bound
+from ..services.github import GitHubService, get_github_service
+from ..services.job_queue import get_job_queue
+from ..services.pagination import decode_cursor, encode_cursor
+from ..services.result_cache import get_result_cache
 
 router = APIRouter(prefix="/api", tags=["analysis"])
 
 
-async def run_analysis(run_id: int, request: AnalyzeRequest, db_url: str):
-    """Background task to run the analysis."""
-    from sqlalchemy import create_engine
-    from sqlalchemy.orm import sessionmaker
-    
-    # Create new session for background task
-    engine = create_engine(db_url, connect_args={"check_same_thread": False} if "sqlite" in db_url else {})
-    SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
-    db = SessionLocal()
-    
-    try:
-        run = db.query(AnalysisRun).filter(AnalysisRun.id == run_id).first()
-        if not run:
-            return
-        
-        run.status = AnalysisStatus.PROCESSING
-        db.commit()
-        
-        github_service = GitHubService()
-        analyzer = AnalyzerService()
-        
-        # Get analysis payload
-        if request.pr_url:
-            pr_data = await github_service.fetch_pr_data(request.pr_url)
-            payload = analyzer.normalize_payload(
-                pr_data,
-                language_hint=request.options.language_hint,
-                rules_yaml=request.options.rules_yaml,
-            )
-            
-            # Try to fetch repo rules if requested
-            if request.options.use_repo_rules and not request.options.rules_yaml:
-                rules = await github_service.get_repo_file(
-                    pr_data.owner, pr_data.repo, "review_rules.yml"
-                ) or await github_service.get_repo_file(
-                    pr_data.owner, pr_data.repo, ".review_rules.yml"
-                )
-                if rules:
-                    payload.rules_yaml = rules
-        else:
-            payload = analyzer.normalize_diff_payload(
-                request.diff_text,
-                language_hint=request.options.language_hint,
-                rules_yaml=request.options.rules_yaml,
-            )
-        
-        # Run analysis
-        review = await analyzer.analyze(payload)
-        markdown = analyzer.format_as_markdown(review)
-        
-        # Save result
-        result = AnalysisResult(
-            run_id=run_id,
-            result_json={
-                "review": review.model_dump(),
-                "markdown": markdown,
-            },
-            model_version=analyzer.settings.llm_model if analyzer.settings.openai_api_key else "heuristics",
-        )
-        db.add(result)
-        
-        run.status = AnalysisStatus.COMPLETED
-        run.completed_at = datetime.utcnow()
-        db.commit()
-        
-    except Exception as e:
-        run = db.query(AnalysisRun).filter(AnalysisRun.id == run_id).first()
-        if run:
-            run.status = AnalysisStatus.FAILED
-            run.error_message = str(e)
-            run.completed_at = datetime.utcnow()
-            db.commit()
-        raise
-    finally:
-        db.close()
-
-
 @router.post("/analyze", response_model=AnalyzeResponse)
 async def analyze_pr(
     request: AnalyzeRequest,
-    background_tasks: BackgroundTasks,
-    db: Session = Depends(get_db),
+    db: AsyncSession = Depends(get_async_db),
+    runs: RunRepository = Depends(get_run_repository),
+    github_service: GitHubService = Depends(get_github_service),
 ):
     """
     Submit a PR for analysis.
@@ -115,30 +57,96 @@ async def analyze_pr(
     # Parse PR URL to get repo info
     repo = None
     pr_number = None
+    head_sha = None
     if request.pr_url:
         try:
-            github_service = GitHubService()
             owner, repo_name, pr_number = github_service.parse_pr_url(request.pr_url)
             repo = f"{owner}/{repo_name}"
         except ValueError as e:
             raise HTTPException(status_code=400, detail=str(e))
+        # Conditional request, so repeat submissions are answered by a free 304.
+        # Without a head (slow, throttled or failing GitHub) the submission
+        # is not coalesced or cached, and the worker reports any failure
+        head_sha = await github_service.get_pr_head_sha(
+            owner, repo_name, pr_number, timeout=get_settings().github_submit_timeout
+        )
+    
+    # An uploaded diff goes to the blob store, hashed and compressed off the
+    # event loop
+    blob = None
+    if not request.pr_url:
+        blob = await run_cpu_bound(prepare_blob, request.diff_text.encode())
+    
+    # Identifies what is being analyzed, for the result cache and coalescing
+    key = analysis_key(
+        request.options,
+        repo=repo,
+        pr_number=pr_number,
+        head_sha=head_sha,
+        diff_sha256=blob.key if blob else None,
+    )
     
-    # Create analysis run
+    # Create analysis run; the blob is stored in the same transaction
+    diff_blob = None
+    if blob:
+        try:
+            diff_blob = await db.run_sync(get_blob_store().put_prepared, blob)
+        except IntegrityError:
+            # Stored meanwhile by an identical upload; nothing else written yet
+            await db.rollback()
+            diff_blob = await db.run_sync(get_blob_store().put_prepared, blob)
     run = AnalysisRun(
         repo=repo,
         pr_number=pr_number,
         pr_url=request.pr_url,
-        diff_text=request.diff_text if not request.pr_url else None,
+        diff_blob=diff_blob,
+        head_sha=head_sha,
+        options_hash=options_hash(request.options),
         status=AnalysisStatus.PENDING,
     )
+    
+    # Unchanged since an earlier analysis: answer from the result cache
+    cache = get_result_cache()
+    cached = None
+    if cache:
+        analyzer = AnalyzerService()
+        cached = await db.run_sync(
+            cache.lookup, result_cache_key(key, analyzer.model_version, analyzer.SCANNER.version)
+        )
+    if cached:
+        db.add(run)
+        await db.flush()
+        await db.run_sync(cache.complete_from, run, cached)
+        await db.commit()
+        result_json = await runs.load_result_json(cached)
+        return AnalyzeResponse(
+            run_id=run.id,
+            status=run.status,
+            message="Reused the result of an identical earlier analysis.",
+            result=StructuredReview(**result_json.get("review", {})),
+        )
+    
+    # Identical submissions attach to the analysis already in flight
+    existing = await runs.get_inflight(key)
+    if existing:
+        return _attached_response(existing)
+    
+    run.inflight_key = key
     db.add(run)
-    db.commit()
-    db.refresh(run)
+    try:
+        await db.flush()
+    except IntegrityError:
+        # Lost the race to a concurrent identical submission
+        await db.rollback()
+        existing = await runs.get_inflight(key)
+        if not existing:
+            raise
+        return _attached_response(existing)
     
-    # Start background analysis
-    from ..config import get_settings
-    settings = get_settings()
-    background_tasks.add_task(run_analysis, run.id, request, settings.database_url)
+    # Queue the analysis; the run and its job are committed together. The
+    # worker reads an uploaded diff from the run's blob
+    await db.run_sync(get_job_queue().enqueue, run.id, request.model_dump(exclude={"diff_text"}))
+    await db.commit()
     
     return AnalyzeResponse(
         run_id=run.id,
@@ -147,13 +155,26 @@ async def analyze_pr(
     )
 
 
+def _attached_response(run: AnalysisRun) -> AnalyzeResponse:
+    return AnalyzeResponse(
+        run_id=run.id,
+        status=run.status,
+        message="An identical analysis is already in progress; attached to its run. "
+                "Use GET /api/runs/{run_id} to check status.",
+    )
+
+
 @router.get("/runs/{run_id}", response_model=RunStatusResponse)
-async def get_run_status(run_id: int, db: Session = Depends(get_db)):
+async def get_run_status(run_id: int, runs: RunRepository = Depends(get_run_repository)):
     """Get the status of an analysis run."""
-    run = db.query(AnalysisRun).filter(AnalysisRun.id == run_id).first()
+    run = await runs.get_status(run_id)
     if not run:
         raise HTTPException(status_code=404, detail="Run not found")
     
+    return _status_response(run)
+
+
+def _status_response(run: AnalysisRun) -> RunStatusResponse:
     return RunStatusResponse(
         run_id=run.id,
         status=run.status,
@@ -167,9 +188,9 @@ async def get_run_status(run_id: int, db: Session = Depends(get_db)):
 
 
 @router.get("/runs/{run_id}/result", response_model=AnalysisResultResponse)
-async def get_run_result(run_id: int, db: Session = Depends(get_db)):
+async def get_run_result(run_id: int, runs: RunRepository = Depends(get_run_repository)):
     """Get the result of a completed analysis run."""
-    run = db.query(AnalysisRun).filter(AnalysisRun.id == run_id).first()
+    run = await runs.get_with_result(run_id)
     if not run:
         raise HTTPException(status_code=404, detail="Run not found")
     
@@ -185,6 +206,7 @@ async def get_run_result(run_id: int, db: Session = Depends(get_db)):
             run_id=run.id,
             status=run.status,
             result=None,
+            partial_findings=run.partial_findings,
         )
     
     if run.status == AnalysisStatus.FAILED:
@@ -193,46 +215,183 @@ async def get_run_result(run_id: int, db: Session = Depends(get_db)):
             detail=f"Analysis failed: {run.error_message}"
         )
     
-    result = db.query(AnalysisResult).filter(AnalysisResult.run_id == run_id).first()
+    result = run.result
     if not result:
         raise HTTPException(status_code=404, detail="Result not found")
-    
-    from ..schemas.analysis import StructuredReview
+    result_json = await runs.load_result_json(result)
     
     return AnalysisResultResponse(
         run_id=run.id,
         status=run.status,
-        result=StructuredReview(**result.result_json.get("review", {})),
+        result=StructuredReview(**result_json.get("review", {})),
         model_version=result.model_version,
-        markdown_comment=result.result_json.get("markdown"),
+        markdown_comment=result_json.get("markdown"),
+        cache_hit=bool(result.cache_hit),
     )
 
 
-@router.get("/runs", response_model=list[RunStatusResponse])
+async def _run_snapshot(run_id: int) -> Optional[dict]:
+    """The run's status and partial findings, or None if there is no such run."""
+    async with AsyncSessionLocal() as db:
+        run = await RunRepository(db).get_progress(run_id)
+        if not run:
+            return None
+        return {
+            "status": AnalysisStatus(run.status).value,
+            "error_message": run.error_message,
+            "partial_findings": run.partial_findings or [],
+        }
+
+
+async def _run_events(run_id: int) -> AsyncIterator[Optional[tuple[str, Any]]]:
+    """
+    The run's current state, then its events until it completes or fails.
+    Yields None when there was nothing to send for a while.
+    """
+    poll_seconds = get_settings().run_events_poll_seconds
+    finished = (AnalysisStatus.COMPLETED.value, AnalysisStatus.FAILED.value)
+    # Subscribe before reading the run, so nothing published in between is missed
+    async with get_event_broker().subscribe(run_id) as events:
+        status = None
+        sent = 0  # Partial findings sent for the current attempt
+        while status not in finished:
+            event = None
+            if status is not None:
+                try:
+                    event, data = await asyncio.wait_for(events.get(), timeout=poll_seconds)
+                except asyncio.TimeoutError:
+                    pass
+            if event is None:
+                # First pass, or nothing published in this process for a
+                # while (the worker may run elsewhere): read the database.
+                # The first snapshot is always sent, even if events arrived
+                # meanwhile; they are only read once there is a status
+                snapshot = await _run_snapshot(run_id)
+                if snapshot is None:
+                    return
+                if status is not None and not events.empty():
+                    continue  # Published meanwhile; deliver those in order first
+                findings = snapshot.pop("partial_findings")
+                idle = True
+                if snapshot["status"] != status:
+                    if snapshot["status"] == AnalysisStatus.PROCESSING.value:
+                        sent = min(sent, len(findings))  # May be a retry starting over
+                    status = snapshot["status"]
+                    idle = False
+                    yield "status", snapshot
+                if status == AnalysisStatus.PROCESSING.value:
+                    if len(findings) < sent:
+                        # Dropped by a fallback to heuristics
+                        sent = 0
+                        idle = False
+                        yield "findings_reset", {}
+                    for finding in findings[sent:]:
+                        idle = False
+                        yield "finding", finding
+                    sent = max(sent, len(findings))
+                if idle:
+                    yield None
+                continue
+            if event == "status":
+                if data["status"] == status:
+                    continue
+                status = data["status"]
+                if status == AnalysisStatus.PROCESSING.value:
+                    sent = 0  # A retry starts over
+            elif event == "finding":
+                sent += 1
+            elif event == "findings_reset":
+                sent = 0
+            yield event, data
+
+
+def _sse(event: str, data: Any) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.get("/runs/{run_id}/events")
+async def stream_run_events(run_id: int):
+    """
+    Stream a run's progress as Server-Sent Events, instead of polling.
+    
+    Sends `status` on every status change (starting with the current one),
+    `stage` with the duration of each analysis stage and `finding` for each
+    finding as it is produced. `findings_reset` means the findings sent so
+    far were dropped (the LLM failed and heuristics are used instead). The
+    stream ends when the run completes or fails; fetch
+    GET /api/runs/{run_id}/result then.
+    """
+    if await _run_snapshot(run_id) is None:
+        raise HTTPException(status_code=404, detail="Run not found")
+    
+    async def stream():
+        async for item in _run_events(run_id):
+            yield ": keepalive\n\n" if item is None else _sse(*item)
+    
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.websocket("/runs/{run_id}/ws")
+async def run_events_websocket(websocket: WebSocket, run_id: int):
+    """The events of GET /api/runs/{run_id}/events as JSON messages."""
+    if await _run_snapshot(run_id) is None:
+        await websocket.close(code=4404, reason="Run not found")
+        return
+    await websocket.accept()
+    try:
+        async for item in _run_events(run_id):
+            if item is None:
+                await websocket.send_json({"event": "ping"})
+            else:
+                await websocket.send_json({"event": item[0], "data": item[1]})
+    except WebSocketDisconnect:
+        return
+    await websocket.close()
+
+
+@router.get("/runs", response_model=RunListResponse)
 async def list_runs(
-    limit: int = 20,
-    offset: int = 0,
-    db: Session = Depends(get_db),
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    repo: Optional[str] = None,
+    status: Optional[AnalysisStatus] = None,
+    created_after: Optional[datetime] = None,
+    created_before: Optional[datetime] = None,
+    runs: RunRepository = Depends(get_run_repository),
 ):
-    """List recent analysis runs."""
-    runs = (
-        db.query(AnalysisRun)
-        .order_by(AnalysisRun.created_at.desc())
-        .offset(offset)
-        .limit(limit)
-        .all()
+    """
+    List analysis runs, newest first.
+    
+    Pages are keyed on (created_at, id) rather than offsets, so deep pages
+    cost the same as the first: pass the returned `next_cursor` as `cursor`
+    to continue. Filtering by repo or status uses the matching composite index.
+    """
+    after = None
+    if cursor:
+        try:
+            after = decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+    
+    # One extra row tells whether there is a next page
+    page = await runs.list_page(
+        limit + 1,
+        after=after,
+        repo=repo,
+        status=status.value if status else None,
+        created_after=created_after,
+        created_before=created_before,
     )
+    next_cursor = None
+    if len(page) > limit:
+        page = page[:limit]
+        next_cursor = encode_cursor(page[-1].created_at, page[-1].id)
     
-    return [
-        RunStatusResponse(
-            run_id=run.id,
-            status=run.status,
-            repo=run.repo,
-            pr_number=run.pr_number,
-            pr_url=run.pr_url,
-            created_at=run.created_at,
-            completed_at=run.completed_at,
-            error_message=run.error_message,
-        )
-        for run in runs
-    ]
+    return RunListResponse(
+        runs=[_status_response(run) for run in page],
+        next_cursor=next_cursor,
+    )
@@ -1,10 +1,9 @@
 from fastapi import APIRouter, HTTPException, Depends
-from sqlalchemy.orm import Session
 
 from ..schemas.github import PostCommentRequest, PostCommentResponse
-from ..models import get_db, AnalysisRun, AnalysisResult
 from ..models.analysis import AnalysisStatus
-from ..services.github import GitHubService
+from ..repositories import RunRepository, get_run_repository
+from ..services.github import GitHubService, get_github_service
 
 router = APIRouter(prefix="/api/github", tags=["github"])
 
@@ -12,15 +11,16 @@ router = APIRouter(prefix="/api/github", tags=["github"])
 @router.post("/post-comment", response_model=PostCommentResponse)
 async def post_github_comment(
     request: PostCommentRequest,
-    db: Session = Depends(get_db),
+    runs: RunRepository = Depends(get_run_repository),
+    github_service: GitHubService = Depends(get_github_service),
 ):
     """
     Post the analysis result as a comment on the GitHub PR.
     
     Requires a valid GitHub token to be configured.
     """
-    # Get the analysis run
-    run = db.query(AnalysisRun).filter(AnalysisRun.id == request.run_id).first()
+    # Get the analysis run and its result
+    run = await runs.get_with_result(request.run_id)
     if not run:
         raise HTTPException(status_code=404, detail="Run not found")
     
@@ -30,17 +30,15 @@ async def post_github_comment(
             detail=f"Analysis is not completed. Current status: {run.status}"
         )
     
-    # Get the result
-    result = db.query(AnalysisResult).filter(AnalysisResult.run_id == request.run_id).first()
+    result = run.result
     if not result:
         raise HTTPException(status_code=404, detail="Result not found")
     
-    markdown_comment = result.result_json.get("markdown")
+    markdown_comment = (await runs.load_result_json(result)).get("markdown")
     if not markdown_comment:
         raise HTTPException(status_code=500, detail="No markdown comment available")
     
     # Parse PR URL
-    github_service = GitHubService()
     try:
         owner, repo, pr_number = github_service.parse_pr_url(request.pr_url)
     except ValueError as e:
@@ -70,9 +68,8 @@ async def post_github_comment(
 @router.get("/validate-url")
 async def validate_pr_url(url: str):
     """Validate a GitHub PR URL and return parsed info."""
-    github_service = GitHubService()
     try:
-        owner, repo, pr_number = github_service.parse_pr_url(url)
+        owner, repo, pr_number = GitHubService.parse_pr_url(url)
         return {
             "valid": True,
             "owner": owner,
@@ -1,4 +1,8 @@
-from fastapi import APIRouter
+from fastapi import APIRouter, Request
+
+from ..services.events import get_event_broker
+from ..services.executors import get_analysis_executor
+from ..services.findings_cache import get_findings_cache
 
 router = APIRouter(tags=["health"])
 
@@ -9,6 +13,23 @@ async def health_check():
     return {"status": "healthy", "service": "AI PR Code Reviewer"}
 
 
+@router.get("/metrics")
+async def metrics(request: Request):
+    """Runtime metrics for the analysis pipeline."""
+    github_cache = getattr(request.app.state, "github_cache", None)
+    rate_limiter = getattr(request.app.state, "github_rate_limiter", None)
+    findings_cache = get_findings_cache()
+    llm_client = getattr(request.app.state, "llm_client", None)
+    return {
+        "analysis_executor": get_analysis_executor().stats(),
+        "github_cache": github_cache.stats() if github_cache is not None else None,
+        "github_rate_limit": rate_limiter.stats() if rate_limiter is not None else None,
+        "file_findings_cache": findings_cache.stats() if findings_cache is not None else None,
+        "llm": llm_client.stats() if llm_client is not None else None,
+        "run_events": get_event_broker().stats(),
+    }
+
+
 @router.get("/")
 async def root():
     """Root endpoint."""
@@ -2,6 +2,7 @@ from .analysis import (
     AnalyzeRequest,
     AnalyzeResponse,
     RunStatusResponse,
+    RunListResponse,
     AnalysisResultResponse,
     PRSummary,
     Finding,
@@ -16,6 +17,7 @@ __all__ = [
     "AnalyzeRequest",
     "AnalyzeResponse",
     "RunStatusResponse",
+    "RunListResponse",
     "AnalysisResultResponse",
     "PRSummary",
     "Finding",
@@ -23,6 +23,7 @@ class AnalyzeOptions(BaseModel):
     use_repo_rules: bool = False
     rules_yaml: Optional[str] = None  # Custom rules YAML
     language_hint: Optional[str] = None  # e.g., "python", "javascript"
+    incremental: bool = False  # Only re-review files changed since the last analyzed head
 
 
 class AnalyzeRequest(BaseModel):
@@ -114,6 +115,12 @@ class RunStatusResponse(BaseModel):
     error_message: Optional[str] = None
 
 
+class RunListResponse(BaseModel):
+    """Response from /api/runs endpoint."""
+    runs: list[RunStatusResponse]
+    next_cursor: Optional[str] = None  # Pass as ?cursor= for the next page; None on the last
+
+
 class AnalysisResultResponse(BaseModel):
     """Response from /api/runs/{run_id}/result endpoint."""
     run_id: int
@@ -121,3 +128,5 @@ class AnalysisResultResponse(BaseModel):
     result: Optional[StructuredReview] = None
     model_version: Optional[str] = None
     markdown_comment: Optional[str] = None  # Pre-formatted for GitHub comment
+    cache_hit: bool = False  # Result reused from an earlier identical analysis
+    partial_findings: Optional[list[Finding]] = None  # Findings so far, while processing
@@ -1,7 +1,7 @@
+import asyncio
 import json
-import re
-from typing import Optional
-from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional
+from dataclasses import dataclass, field, replace
 from ..schemas.analysis import (
     StructuredReview,
     PRSummary,
@@ -13,9 +13,26 @@ from ..schemas.analysis import (
     RiskLevel,
 )
 from ..services.github import PRData
+from ..services.diff_index import DiffIndex
+from ..services.diff_parser import DiffFile, filter_diff, parse_diff
+from ..services.scanner import PatternScanner, ScanMatch, ScanRule
+from ..services.executors import get_scan_pool, run_cpu_bound
+from ..services.findings_cache import FileFindingsCache, get_findings_cache
+from ..services.json_stream import JSONArrayStream
+from ..services.llm import LLMClient, create_llm_client
+from ..services.prompt_budget import drop_low_signal, fit_diff, fit_lines, get_token_counter, split_diff_tokens
 from ..config import get_settings
 
 
+# Wraps the diff in the prompt
+DIFF_FENCE = "\n## Diff:\n```\n\n```"
+
+# Called with each finding as it is streamed from the LLM
+FindingCallback = Callable[[Finding], Awaitable[None]]
+# Called when findings already streamed are dropped for a heuristic review
+DiscardCallback = Callable[[], Awaitable[None]]
+
+
 @dataclass
 class AnalysisPayload:
     """Normalized analysis payload."""
@@ -27,6 +44,15 @@ class AnalysisPayload:
     commits: list[str]
     language_hint: Optional[str] = None
     rules_yaml: Optional[str] = None
+    diff_files: Optional[list[DiffFile]] = field(default=None, repr=False)
+    diff_index: Optional[DiffIndex] = field(default=None, repr=False)
+    
+    def __post_init__(self):
+        # Parsed and indexed once per payload, shared by every rule
+        if self.diff_files is None:
+            self.diff_files = list(parse_diff(self.diff))
+        if self.diff_index is None:
+            self.diff_index = DiffIndex(self.diff_files)
 
 
 class AnalyzerService:
@@ -60,13 +86,26 @@ class AnalyzerService:
         (r"permission|role|access.*control", "Permission/role change"),
     ]
     
-    def __init__(self):
+    # All heuristic rules compiled once into a single-pass scanner
+    SCANNER = PatternScanner(
+        [ScanRule(p, d, "security") for p, d in SECURITY_PATTERNS]
+        + [ScanRule(p, d, "performance") for p, d in PERF_PATTERNS]
+        + [ScanRule(p, d, "auth", first_only=True) for p, d in AUTH_PATTERNS]
+    )
+    
+    def __init__(self, llm: Optional[LLMClient] = None):
         self.settings = get_settings()
+        self.llm = llm  # Shared client from the app/worker; None creates one per analysis
+    
+    @property
+    def model_version(self) -> str:
+        """The model results are attributed to."""
+        return self.settings.llm_model if self.settings.openai_api_key else "heuristics"
     
     def normalize_payload(self, pr_data: PRData, language_hint: Optional[str] = None, rules_yaml: Optional[str] = None) -> AnalysisPayload:
         """Normalize PR data into analysis payload."""
         file_names = [f.get("filename", "") for f in pr_data.files]
-        commit_messages = [c.get("commit", {}).get("message", "") for c in pr_data.commits]
+        diff_files = list(parse_diff(pr_data.diff))
         
         return AnalysisPayload(
             title=pr_data.title,
@@ -74,15 +113,17 @@ class AnalyzerService:
             diff=pr_data.diff,
             files=pr_data.files,
             file_names=file_names,
-            commits=commit_messages,
+            commits=pr_data.commits,
             language_hint=language_hint,
             rules_yaml=rules_yaml,
+            diff_files=diff_files,
+            diff_index=DiffIndex(diff_files),
         )
     
     def normalize_diff_payload(self, diff_text: str, language_hint: Optional[str] = None, rules_yaml: Optional[str] = None) -> AnalysisPayload:
         """Normalize raw diff text into analysis payload."""
-        # Extract file names from diff
-        file_names = re.findall(r"^\+\+\+ b/(.+)$", diff_text, re.MULTILINE)
+        diff_files = list(parse_diff(diff_text))
+        file_names = [f.path for f in diff_files]
         
         return AnalysisPayload(
             title="Uploaded Diff",
@@ -93,34 +134,153 @@ class AnalyzerService:
             commits=[],
             language_hint=language_hint,
             rules_yaml=rules_yaml,
+            diff_files=diff_files,
+            diff_index=DiffIndex(diff_files),
+        )
+    
+    def restrict_to_files(self, payload: AnalysisPayload, paths: set[str]) -> AnalysisPayload:
+        """
+        Narrow the diff to `paths` for an incremental review. Title, body,
+        file list and commits are kept so the review still sees the whole PR.
+        """
+        diff_files = [f for f in payload.diff_files if f.old_path in paths or f.new_path in paths]
+        return replace(
+            payload,
+            diff=filter_diff(payload.diff, paths),
+            diff_files=diff_files,
+            diff_index=DiffIndex(diff_files),
         )
     
-    async def analyze(self, payload: AnalysisPayload) -> StructuredReview:
-        """Run analysis on the payload."""
+    def merge_incremental(self, previous: StructuredReview, review: StructuredReview, changed: set[str], files: list[str]) -> StructuredReview:
+        """
+        Combine a review of the `changed` files with the previous review of
+        the PR. Findings for untouched files still in the PR are carried
+        over; risk levels never drop below the previous ones, since they
+        can't be attributed to individual files.
+        """
+        current = set(files)
+        carried = [
+            f for f in previous.findings
+            if f.file not in changed and (f.file in current or f.file in ("multiple", "unknown"))
+        ]
+        seen = {(f.title, f.file, f.line_number) for f in review.findings}
+        carried = [f for f in carried if (f.title, f.file, f.line_number) not in seen]
+        findings = review.findings + carried
+        
+        levels = [RiskLevel.LOW, RiskLevel.MEDIUM, RiskLevel.HIGH]
+        risk = {
+            name: max(getattr(review.risk_matrix, name), getattr(previous.risk_matrix, name), key=levels.index)
+            for name in RiskMatrix.model_fields
+        }
+        
+        # Same penalties as the heuristic score, applied for the carried findings
+        critical_count = len([f for f in carried if f.severity == Severity.CRITICAL])
+        high_count = len([f for f in carried if f.severity == Severity.HIGH])
+        score = max(0, review.merge_readiness.score - (critical_count * 30) - (high_count * 15) - (len(carried) * 2))
+        blockers = list(dict.fromkeys(
+            review.merge_readiness.blockers
+            + [f.title for f in carried if f.severity in [Severity.CRITICAL, Severity.HIGH]]
+        ))
+        
+        def union(new: list[str], old: list[str]) -> list[str]:
+            return list(dict.fromkeys(new + old))[:5]
+        
+        return StructuredReview(
+            pr_summary=review.pr_summary,
+            findings=findings[:20],
+            risk_matrix=RiskMatrix(**risk),
+            test_plan=TestPlan(
+                unit_tests=union(review.test_plan.unit_tests, previous.test_plan.unit_tests),
+                integration_tests=union(review.test_plan.integration_tests, previous.test_plan.integration_tests),
+                edge_cases=union(review.test_plan.edge_cases, previous.test_plan.edge_cases),
+            ),
+            merge_readiness=MergeReadiness(
+                score=score,
+                blockers=blockers[:5],
+                notes=f"{review.merge_readiness.notes} Re-reviewed {len(changed)} changed file(s); "
+                      f"{len(carried)} finding(s) carried over from the previous review.",
+            ),
+        )
+    
+    async def analyze(
+        self,
+        payload: AnalysisPayload,
+        on_finding: Optional[FindingCallback] = None,
+        on_discard: Optional[DiscardCallback] = None,
+    ) -> StructuredReview:
+        """
+        Run analysis on the payload.
+        
+        With `on_finding` and LLM_STREAMING, LLM findings are passed to it as
+        soon as they are generated, before the review is complete. If the
+        LLM then fails, `on_discard` is called before falling back to
+        heuristics, since those findings won't be in the review.
+        """
         # Try LLM analysis first, fall back to heuristics
         if self.settings.openai_api_key:
             try:
-                return await self._analyze_with_llm(payload)
+                return await self._analyze_with_llm(payload, on_finding)
             except Exception as e:
                 print(f"LLM analysis failed, falling back to heuristics: {e}")
+                if on_discard is not None:
+                    await on_discard()
         
-        return self._analyze_with_heuristics(payload)
+        matches = await self._scan_heuristics(payload)
+        return await run_cpu_bound(self._analyze_with_heuristics, payload, matches)
     
-    async def _analyze_with_llm(self, payload: AnalysisPayload) -> StructuredReview:
+    async def _analyze_with_llm(self, payload: AnalysisPayload, on_finding: Optional[FindingCallback] = None) -> StructuredReview:
         """Analyze using LLM (OpenAI)."""
-        import openai
-        
-        client = openai.AsyncOpenAI(api_key=self.settings.openai_api_key)
-        
-        # Truncate diff if too large
-        max_diff_chars = 15000
-        diff_text = payload.diff[:max_diff_chars]
-        if len(payload.diff) > max_diff_chars:
-            diff_text += "\n\n[Diff truncated due to size...]"
-        
+        llm = self.llm or create_llm_client(self.settings)
+        if llm is None:
+            raise RuntimeError("LLM client is not available")
+        try:
+            return await self._review_diff(llm, payload, on_finding)
+        finally:
+            if llm is not self.llm:
+                await llm.aclose()
+    
+    async def _review_diff(self, llm: LLMClient, payload: AnalysisPayload, on_finding: Optional[FindingCallback] = None) -> StructuredReview:
+        # Large diffs are reviewed chunk by chunk and the reviews merged;
+        # lockfiles, generated code and whitespace-only hunks aren't worth a chunk
+        counter = get_token_counter(self.settings.llm_model)
+        max_chunks = self.settings.llm_max_chunks
+        # Chunks must fit in what the prompt has left for the diff once the
+        # description, file list, rules etc. are in, part note included
+        chunk_tokens = min(
+            self.settings.llm_chunk_tokens,
+            self._diff_budget(payload) - counter.count(self._part_note(max_chunks, max_chunks, max_chunks * 100)),
+        )
+        chunk_tokens = max(chunk_tokens, 1)
+        diff = payload.diff
+        if counter.count(diff) > chunk_tokens:
+            diff, omitted_notes = drop_low_signal(diff)
+            if omitted_notes:
+                diff += f"\n[Omitted low-signal changes: {', '.join(omitted_notes)}]\n"
+        chunks = split_diff_tokens(counter, diff, chunk_tokens)
+        if len(chunks) <= 1:
+            return await self._review_chunk(llm, payload, diff, on_finding)
+        
+        omitted = max(0, len(chunks) - max_chunks)
+        chunks = chunks[:max_chunks]
+        
+        # The shared client caps how many of these run at once
+        async def review(i: int, chunk: str) -> StructuredReview:
+            note = self._part_note(i + 1, len(chunks), omitted if i == len(chunks) - 1 else 0)
+            return await self._review_chunk(llm, payload, chunk + note, on_finding)
+        
+        reviews = await asyncio.gather(*(review(i, chunk) for i, chunk in enumerate(chunks)))
+        return self._reduce_reviews(reviews, omitted)
+    
+    async def _review_chunk(
+        self,
+        llm: LLMClient,
+        payload: AnalysisPayload,
+        diff_text: str,
+        on_finding: Optional[FindingCallback] = None,
+    ) -> StructuredReview:
+        """Review one diff (or part of one) with the LLM."""
         prompt = self._build_llm_prompt(payload, diff_text)
-        
-        response = await client.chat.completions.create(
+        request = dict(
             model=self.settings.llm_model,
             messages=[
                 {"role": "system", "content": self._get_system_prompt()},
@@ -131,8 +291,77 @@ class AnalyzerService:
             max_tokens=4000,
         )
         
-        result_json = json.loads(response.choices[0].message.content)
-        return self._parse_llm_response(result_json)
+        if on_finding is None or not self.settings.llm_streaming:
+            response = await llm.chat(**request)
+            result_json = json.loads(response.choices[0].message.content)
+            return self._parse_llm_response(result_json)
+        
+        # Hand each finding over as soon as its JSON object is complete
+        findings = JSONArrayStream("findings")
+        async for text in llm.chat_stream(**request):
+            for item in findings.feed(text):
+                try:
+                    finding = self._parse_finding(item)
+                except (ValueError, TypeError):
+                    continue
+                await on_finding(finding)
+        return self._parse_llm_response(json.loads(findings.text))
+    
+    @staticmethod
+    def _part_note(part: int, parts: int, omitted: int = 0) -> str:
+        note = f"\n\n[Part {part} of {parts} of the diff; other parts are reviewed separately]"
+        if omitted:
+            note += f"\n[{omitted} more part(s) omitted due to size...]"
+        return note
+    
+    def _reduce_reviews(self, reviews: list[StructuredReview], omitted: int = 0) -> StructuredReview:
+        """
+        Merge per-chunk reviews into one. Findings are combined, each risk
+        takes its highest level, and the merge score takes the lowest.
+        """
+        findings = []
+        seen = set()
+        for review in reviews:
+            for finding in review.findings:
+                key = (finding.title, finding.file, finding.line_number)
+                if key not in seen:
+                    seen.add(key)
+                    findings.append(finding)
+        severity_order = {Severity.CRITICAL: 0, Severity.HIGH: 1, Severity.MEDIUM: 2, Severity.LOW: 3}
+        findings.sort(key=lambda f: severity_order.get(f.severity, 4))
+        
+        levels = [RiskLevel.LOW, RiskLevel.MEDIUM, RiskLevel.HIGH]
+        risk = {
+            name: max((getattr(r.risk_matrix, name) for r in reviews), key=levels.index)
+            for name in RiskMatrix.model_fields
+        }
+        
+        def union(values: list[list[str]], limit: int) -> list[str]:
+            return list(dict.fromkeys(v for vs in values for v in vs))[:limit]
+        
+        notes = " ".join(dict.fromkeys(r.merge_readiness.notes for r in reviews if r.merge_readiness.notes))
+        if omitted:
+            notes += f" {omitted} part(s) of the diff were too large to review."
+        
+        return StructuredReview(
+            pr_summary=PRSummary(
+                what_changed=" ".join(dict.fromkeys(r.pr_summary.what_changed for r in reviews)),
+                why_it_changed=reviews[0].pr_summary.why_it_changed,
+                key_files=union([r.pr_summary.key_files for r in reviews], 5),
+            ),
+            findings=findings[:20],
+            risk_matrix=RiskMatrix(**risk),
+            test_plan=TestPlan(
+                unit_tests=union([r.test_plan.unit_tests for r in reviews], 5),
+                integration_tests=union([r.test_plan.integration_tests for r in reviews], 5),
+                edge_cases=union([r.test_plan.edge_cases for r in reviews], 5),
+            ),
+            merge_readiness=MergeReadiness(
+                score=min(r.merge_readiness.score for r in reviews),
+                blockers=union([r.merge_readiness.blockers for r in reviews], 5),
+                notes=notes.strip(),
+            ),
+        )
     
     def _get_system_prompt(self) -> str:
         return """You are an expert code reviewer. Analyze the provided PR/diff and output a structured JSON review.
@@ -181,24 +410,55 @@ Output format (JSON):
   }
 }"""
     
-    def _build_llm_prompt(self, payload: AnalysisPayload, diff_text: str) -> str:
-        prompt_parts = [
-            f"# PR Title: {payload.title}",
-            f"\n## Description:\n{payload.body}" if payload.body else "",
-            f"\n## Files Changed ({len(payload.file_names)}):",
-            "\n".join(f"- {f}" for f in payload.file_names[:50]),
-            f"\n## Commit Messages:",
-            "\n".join(f"- {c}" for c in payload.commits[:10]) if payload.commits else "No commit messages available",
-            f"\n## Diff:\n```\n{diff_text}\n```",
-        ]
-        
+    def _fixed_sections(self, payload: AnalysisPayload, extra: int = 0) -> list[str]:
+        """
+        Every prompt section but the diff, within `llm_prompt_tokens`.
+        
+        Title, rules and language hint come first; the description, file
+        list and commits get capped shares, each raised by `extra` tokens.
+        """
+        counter = get_token_counter(self.settings.llm_model)
+        budget = self.settings.llm_prompt_tokens
+        
+        title = counter.truncate(f"# PR Title: {payload.title}", 100)
+        rules = ""
         if payload.rules_yaml:
-            prompt_parts.append(f"\n## Custom Review Rules:\n```yaml\n{payload.rules_yaml}\n```")
-        
-        if payload.language_hint:
-            prompt_parts.append(f"\n## Language Hint: {payload.language_hint}")
-        
-        return "\n".join(prompt_parts)
+            rules = f"\n## Custom Review Rules:\n```yaml\n{counter.truncate(payload.rules_yaml, budget // 4)}\n```"
+        hint = f"\n## Language Hint: {payload.language_hint}" if payload.language_hint else ""
+        commit_lines = [c.strip().splitlines()[0] if c.strip() else "" for c in payload.commits]
+        
+        body = ""
+        if payload.body:
+            body = f"\n## Description:\n{counter.truncate(payload.body, int(budget * 0.15) + extra)}"
+        files = fit_lines(counter, f"\n## Files Changed ({len(payload.file_names)}):", payload.file_names, int(budget * 0.10) + extra)
+        commits = fit_lines(counter, "\n## Commit Messages:", commit_lines, int(budget * 0.10) + extra)
+        return [title, body, files, commits or "\n## Commit Messages:\nNo commit messages available", rules, hint]
+    
+    def _diff_budget(self, payload: AnalysisPayload) -> int:
+        """Tokens left for the diff in a prompt for this payload."""
+        counter = get_token_counter(self.settings.llm_model)
+        sections = self._fixed_sections(payload) + [DIFF_FENCE]
+        return self.settings.llm_prompt_tokens - sum(map(counter.count, sections))
+    
+    def _build_llm_prompt(self, payload: AnalysisPayload, diff_text: str) -> str:
+        """
+        Build the user prompt within `llm_prompt_tokens` for the configured model.
+        
+        The diff gets what the other sections leave (see _fixed_sections);
+        whatever it doesn't use is handed back to the capped sections.
+        """
+        counter = get_token_counter(self.settings.llm_model)
+        budget = self._diff_budget(payload)
+        diff = fit_diff(counter, diff_text, budget)
+        
+        sections = self._fixed_sections(payload)
+        spare = budget - counter.count(diff)
+        if spare >= 3:
+            sections = self._fixed_sections(payload, spare // 3)
+        
+        title, body, files, commits, rules, hint = sections
+        prompt_parts = [title, body, files, commits, f"\n## Diff:\n```\n{diff}\n```", rules, hint]
+        return "\n".join(part for part in prompt_parts if part)
     
     def _parse_llm_response(self, result: dict) -> StructuredReview:
         """Parse and validate LLM response into StructuredReview."""
@@ -209,18 +469,7 @@ Output format (JSON):
                     "why_it_changed": "Unable to parse",
                     "key_files": []
                 })),
-                findings=[
-                    Finding(
-                        title=f.get("title", "Unknown"),
-                        severity=Severity(f.get("severity", "low")),
-                        confidence=float(f.get("confidence", 0.5)),
-                        file=f.get("file", "unknown"),
-                        line_number=f.get("line_number"),
-                        evidence=f.get("evidence", ""),
-                        recommendation=f.get("recommendation", "")
-                    )
-                    for f in result.get("findings", [])
-                ],
+                findings=[self._parse_finding(f) for f in result.get("findings", [])],
                 risk_matrix=RiskMatrix(
                     security=RiskLevel(result.get("risk_matrix", {}).get("security", "low")),
                     performance=RiskLevel(result.get("risk_matrix", {}).get("performance", "low")),
@@ -243,57 +492,147 @@ Output format (JSON):
             # Return heuristics-based analysis as fallback
             raise
     
-    def _analyze_with_heuristics(self, payload: AnalysisPayload) -> StructuredReview:
+    def _parse_finding(self, f: dict) -> Finding:
+        return Finding(
+            title=f.get("title", "Unknown"),
+            severity=Severity(f.get("severity", "low")),
+            confidence=float(f.get("confidence", 0.5)),
+            file=f.get("file", "unknown"),
+            line_number=f.get("line_number"),
+            evidence=f.get("evidence", ""),
+            recommendation=f.get("recommendation", "")
+        )
+    
+    async def _scan_heuristics(self, payload: AnalysisPayload) -> list[ScanMatch]:
+        """
+        Scan the added code for heuristic rule matches.
+        
+        Files are scanned as separate spans and merged back. With the
+        findings cache enabled, files already scanned in an earlier run are
+        taken from the cache instead.
+        """
+        index = payload.diff_index
+        spans = index.file_spans()
+        cache = get_findings_cache()
+        if cache is None:
+            nonempty = [(start, end) for start, end in spans if end > start]
+            return self.SCANNER.merge(await self._scan_spans(index.text, nonempty))
+        
+        keys = await run_cpu_bound(self._findings_keys, payload, spans)
+        hits = await cache.get_many([key for key in keys if key])
+        todo = [i for i, (start, end) in enumerate(spans) if end > start and keys[i] not in hits]
+        scanned = dict(zip(todo, await self._scan_spans(index.text, [spans[i] for i in todo])))
+        
+        results = []
+        fresh = {}
+        for i, (start, end) in enumerate(spans):
+            if i in scanned:
+                results.append(scanned[i])
+                if keys[i]:
+                    fresh[keys[i]] = [[idx, s - start, e - start, text] for idx, s, e, text in scanned[i]]
+            elif keys[i] in hits:
+                results.append([(idx, s + start, e + start, text) for idx, s, e, text in hits[keys[i]]])
+        if fresh:
+            await cache.put_many(fresh)
+        # Per-file results merge exactly like shards of the whole text
+        return self.SCANNER.merge(results)
+    
+    def _findings_keys(self, payload: AnalysisPayload, spans: list[tuple[int, int]]) -> list[Optional[str]]:
+        """Findings cache key per file, or None for files without a known blob."""
+        blobs = {f.get("filename"): f.get("sha") for f in payload.files if f.get("sha")}
+        keys = []
+        for diff_file, (start, end) in zip(payload.diff_files, spans):
+            blob = blobs.get(diff_file.path) or diff_file.new_blob
+            if blob and end > start:
+                keys.append(FileFindingsCache.key(blob, payload.diff_index.text[start:end], self.SCANNER.version))
+            else:
+                keys.append(None)
+        return keys
+    
+    async def _scan_spans(self, text: str, spans: list[tuple[int, int]]) -> list[list[tuple[int, int, int, str]]]:
+        """
+        scan_compact() results for each (start, end) span of `text`.
+        
+        Large scans are batched across the process pool; small ones stay
+        in-process where IPC would cost more than it saves.
+        """
+        workers = self.settings.heuristic_scan_workers
+        total = sum(end - start for start, end in spans)
+        if workers <= 0 or total < self.settings.heuristic_parallel_threshold:
+            return await run_cpu_bound(_scan_segments, [(text[start:end], start) for start, end in spans])
+        
+        # Group spans into about workers * 4 batches for the process pool
+        target = max(1, total // (workers * 4))
+        batches = [[]]
+        size = 0
+        for start, end in spans:
+            if size >= target:
+                batches.append([])
+                size = 0
+            batches[-1].append((start, end))
+            size += end - start
+        
+        loop = asyncio.get_running_loop()
+        pool = get_scan_pool()
+        results = await asyncio.gather(*(
+            loop.run_in_executor(pool, _scan_segments, [(text[start:end], start) for start, end in batch])
+            for batch in batches
+        ))
+        return [result for batch in results for result in batch]
+    
+    def _analyze_with_heuristics(self, payload: AnalysisPayload, matches: Optional[list[ScanMatch]] = None) -> StructuredReview:
         """Fallback heuristics-based analysis."""
         findings = []
         security_risk = RiskLevel.LOW
         perf_risk = RiskLevel.LOW
         
-        # Check security patterns
-        for pattern, description in self.SECURITY_PATTERNS:
-            matches = re.finditer(pattern, payload.diff, re.IGNORECASE)
-            for match in matches:
-                # Find which file this is in
-                file_name = self._find_file_for_match(payload.diff, match.start())
+        # Only added lines are scanned, so deleted code never raises findings
+        index = payload.diff_index
+        if matches is None:
+            matches = self.SCANNER.scan(index.text)
+        
+        auth_changes = False
+        for match in matches:
+            rule = match.rule
+            
+            if rule.category == "auth":
+                auth_changes = True
                 findings.append(Finding(
-                    title=description,
+                    title=rule.description,
+                    severity=Severity.MEDIUM,
+                    confidence=0.8,
+                    file="multiple",
+                    evidence=f"Pattern matched: {rule.pattern}",
+                    recommendation="Ensure auth changes are thoroughly tested",
+                ))
+                continue
+            
+            # Find which file and line this is in
+            file_name = index.file_at(match.start)
+            line_number = index.line_at(match.start)
+            if rule.category == "security":
+                findings.append(Finding(
+                    title=rule.description,
                     severity=Severity.HIGH,
                     confidence=0.7,
                     file=file_name or "unknown",
-                    evidence=match.group(0),
-                    recommendation=f"Review and verify this is not a security issue: {description}",
+                    line_number=line_number,
+                    evidence=match.text,
+                    recommendation=f"Review and verify this is not a security issue: {rule.description}",
                 ))
                 security_risk = RiskLevel.HIGH
-        
-        # Check performance patterns
-        for pattern, description in self.PERF_PATTERNS:
-            matches = re.finditer(pattern, payload.diff, re.IGNORECASE)
-            for match in matches:
-                file_name = self._find_file_for_match(payload.diff, match.start())
+            else:
                 findings.append(Finding(
-                    title=description,
+                    title=rule.description,
                     severity=Severity.MEDIUM,
                     confidence=0.6,
                     file=file_name or "unknown",
-                    evidence=match.group(0),
-                    recommendation=f"Consider performance implications: {description}",
+                    line_number=line_number,
+                    evidence=match.text,
+                    recommendation=f"Consider performance implications: {rule.description}",
                 ))
                 perf_risk = RiskLevel.MEDIUM
         
-        # Check auth patterns
-        auth_changes = False
-        for pattern, description in self.AUTH_PATTERNS:
-            if re.search(pattern, payload.diff, re.IGNORECASE):
-                auth_changes = True
-                findings.append(Finding(
-                    title=description,
-                    severity=Severity.MEDIUM,
-                    confidence=0.8,
-                    file="multiple",
-                    evidence=f"Pattern matched: {pattern}",
-                    recommendation="Ensure auth changes are thoroughly tested",
-                ))
-        
         # Determine key files (most changed)
         key_files = sorted(
             payload.files,
@@ -333,15 +672,6 @@ Output format (JSON):
             ),
         )
     
-    def _find_file_for_match(self, diff: str, match_pos: int) -> Optional[str]:
-        """Find which file a diff match belongs to."""
-        # Look backwards from match position for file header
-        before_match = diff[:match_pos]
-        file_headers = list(re.finditer(r"^\+\+\+ b/(.+)$", before_match, re.MULTILINE))
-        if file_headers:
-            return file_headers[-1].group(1)
-        return None
-    
     def _generate_test_suggestions(self, payload: AnalysisPayload, findings: list[Finding], auth_changes: bool) -> TestPlan:
         """Generate test suggestions based on analysis."""
         unit_tests = []
@@ -473,3 +803,8 @@ Output format (JSON):
         ])
         
         return "\n".join(lines)
+
+
+def _scan_segments(segments: list[tuple[str, int]]) -> list[list[tuple[int, int, int, str]]]:
+    """Process pool entry point: scan each (text, offset) segment separately."""
+    return [AnalyzerService.SCANNER.scan_compact(text, offset) for text, offset in segments]
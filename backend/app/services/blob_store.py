@@ -0,0 +1,172 @@
+import abc
+import gzip
+import hashlib
+import json
+import os
+import tempfile
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Optional
+
+from sqlalchemy.orm import Session
+
+from ..config import get_settings
+from ..models.analysis import AnalysisRun, AnalysisResult
+from ..models.blob import Blob
+
+try:
+    import zstandard
+except ImportError:  # Optional; blobs are gzip-compressed without it
+    zstandard = None
+
+
+def _compress(data: bytes) -> tuple[str, bytes]:
+    if zstandard is not None:
+        return "zstd", zstandard.ZstdCompressor(level=10).compress(data)
+    return "gzip", gzip.compress(data, compresslevel=6, mtime=0)
+
+
+def _decompress(codec: str, data: bytes) -> bytes:
+    if codec == "gzip":
+        return gzip.decompress(data)
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("Blob is zstd-compressed but the 'zstandard' package is not installed")
+        return zstandard.ZstdDecompressor().decompress(data)
+    raise ValueError(f"Unknown blob codec: {codec}")
+
+
+@dataclass(frozen=True)
+class PreparedBlob:
+    """Content hashed and compressed for storing, see prepare_blob()."""
+    key: str
+    codec: str
+    size: int
+    data: bytes
+
+
+def prepare_blob(data: bytes) -> PreparedBlob:
+    """
+    Hash and compress content. CPU-bound; request handlers run it on the
+    analysis executor and then store the result with put_prepared().
+    """
+    codec, compressed = _compress(data)
+    return PreparedBlob(key=hashlib.sha256(data).hexdigest(), codec=codec, size=len(data), data=compressed)
+
+
+class BlobStore(abc.ABC):
+    """
+    Content-addressed storage for large payloads (uploaded diffs, stored
+    reviews), so the rows referencing them stay narrow. Content is keyed by
+    its SHA-256 and stored compressed, once: identical diffs and reviews
+    reused from the result cache share one blob. Blobs are never deleted.
+    """
+
+    def put(self, db: Session, data: bytes) -> str:
+        """Store `data` if it isn't already; returns its key."""
+        return self.put_prepared(db, prepare_blob(data))
+
+    @abc.abstractmethod
+    def put_prepared(self, db: Session, blob: PreparedBlob) -> str:
+        """Store a blob from prepare_blob() if it isn't already; returns its key."""
+
+    @abc.abstractmethod
+    def get(self, db: Session, key: str) -> bytes:
+        """Content stored under `key`; raises KeyError if there is none."""
+
+    def put_text(self, db: Session, text: str) -> str:
+        return self.put(db, text.encode())
+
+    def get_text(self, db: Session, key: str) -> str:
+        return self.get(db, key).decode()
+
+    def put_json(self, db: Session, value: Any) -> str:
+        # Canonical form, so equal values deduplicate
+        return self.put(db, json.dumps(value, sort_keys=True, separators=(",", ":")).encode())
+
+    def get_json(self, db: Session, key: str) -> Any:
+        return json.loads(self.get(db, key))
+
+
+class DatabaseBlobStore(BlobStore):
+    """
+    Blobs in the `blobs` table, written in the caller's transaction so they
+    commit or roll back with the rows referencing them.
+
+    If an identical blob is stored concurrently, flushing raises
+    IntegrityError and the caller's transaction is rolled back. Callers
+    store the blob before anything else in the transaction, so after the
+    rollback they can just retry: the blob is then already there.
+    """
+
+    def put_prepared(self, db: Session, blob: PreparedBlob) -> str:
+        if db.query(Blob.key).filter(Blob.key == blob.key).first() is not None:
+            return blob.key
+        db.add(Blob(key=blob.key, codec=blob.codec, size=blob.size, data=blob.data))
+        db.flush()
+        return blob.key
+
+    def get(self, db: Session, key: str) -> bytes:
+        blob = db.get(Blob, key)
+        if blob is None:
+            raise KeyError(f"Blob {key} not found")
+        return _decompress(blob.codec, blob.data)
+
+
+class FileBlobStore(BlobStore):
+    """Blobs as files under `root`, e.g. on a volume shared by API and workers."""
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def _path(self, key: str, codec: str) -> str:
+        return os.path.join(self.root, key[:2], f"{key}.{codec}")
+
+    def put_prepared(self, db: Session, blob: PreparedBlob) -> str:
+        key = blob.key
+        if any(os.path.exists(self._path(key, codec)) for codec in ("zstd", "gzip")):
+            return key
+        path = self._path(key, blob.codec)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # Write then rename, so readers never see a partial blob
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path))
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(blob.data)
+            os.replace(tmp, path)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+        return key
+
+    def get(self, db: Session, key: str) -> bytes:
+        for codec in ("zstd", "gzip"):
+            try:
+                with open(self._path(key, codec), "rb") as f:
+                    return _decompress(codec, f.read())
+            except FileNotFoundError:
+                continue
+        raise KeyError(f"Blob {key} not found")
+
+
+@lru_cache()
+def get_blob_store() -> BlobStore:
+    """The configured blob store."""
+    settings = get_settings()
+    if settings.blob_store == "filesystem":
+        return FileBlobStore(settings.blob_store_path)
+    return DatabaseBlobStore()
+
+
+def load_diff_text(db: Session, run: AnalysisRun) -> Optional[str]:
+    """The run's uploaded diff, from the blob store or, for older runs, inline."""
+    if run.diff_blob:
+        return get_blob_store().get_text(db, run.diff_blob)
+    return run.diff_text
+
+
+def load_result_json(db: Session, result: AnalysisResult) -> dict:
+    """The stored review and markdown, from the blob store or, for older results, inline."""
+    if result.result_blob:
+        return get_blob_store().get_json(db, result.result_blob)
+    return result.result_json or {}
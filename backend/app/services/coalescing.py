@@ -0,0 +1,49 @@
+import hashlib
+import json
+from typing import Optional
+
+from ..schemas.analysis import AnalyzeOptions
+
+
+def options_hash(options: AnalyzeOptions) -> str:
+    """Stable hash of the options that affect the review."""
+    encoded = json.dumps(options.model_dump(exclude={"incremental"}), sort_keys=True).encode()
+    return hashlib.sha256(encoded).hexdigest()[:16]
+
+
+def analysis_key(
+    options: AnalyzeOptions,
+    repo: Optional[str] = None,
+    pr_number: Optional[int] = None,
+    head_sha: Optional[str] = None,
+    diff_text: Optional[str] = None,
+    diff_sha256: Optional[str] = None,
+) -> Optional[str]:
+    """
+    Identity of an analysis: two submissions with the same key produce the
+    same review. PRs are identified by (repo, pr_number, head_sha), uploaded
+    diffs by a hash of their text (`diff_sha256` if already computed, e.g.
+    as the diff's blob key). Returns None when the input can't be
+    identified (e.g. the PR head couldn't be looked up), so it is never
+    coalesced.
+    """
+    if diff_sha256 is None and diff_text is not None:
+        diff_sha256 = hashlib.sha256(diff_text.encode()).hexdigest()
+    if repo and pr_number and head_sha:
+        subject = f"pr:{repo}#{pr_number}@{head_sha}"
+    elif diff_sha256 is not None:
+        subject = f"diff:{diff_sha256}"
+    else:
+        return None
+    return f"{subject}:{options_hash(options)}"
+
+
+def result_cache_key(key: Optional[str], model_version: str, rules_version: str) -> Optional[str]:
+    """
+    Key a stored review by what was analyzed, the model that reviewed it
+    and the heuristic rule set, so a rule change isn't answered with stale
+    findings.
+    """
+    if key is None:
+        return None
+    return f"{key}:{model_version}:{rules_version}"
@@ -0,0 +1,57 @@
+from bisect import bisect_right
+from typing import Optional
+
+from .diff_parser import DiffFile
+
+
+class DiffIndex:
+    """
+    Offset index over the added lines of a parsed diff.
+
+    Concatenates every `+` line into one `text` buffer (one line per added
+    line) and records where each file and line starts, so any position in
+    the buffer resolves to its file and new-side line number with a binary
+    search. Rules scan `text` and never see removed or context lines.
+    """
+
+    def __init__(self, files: list[DiffFile]):
+        self.file_offsets: list[int] = []
+        self.file_names: list[str] = []
+        self.line_offsets: list[int] = []
+        self.line_numbers: list[int] = []
+
+        parts = []
+        pos = 0
+        for diff_file in files:
+            self.file_offsets.append(pos)
+            self.file_names.append(diff_file.path)
+            for line in diff_file.added_lines():
+                self.line_offsets.append(pos)
+                self.line_numbers.append(line.new_lineno)
+                parts.append(line.content)
+                pos += len(line.content) + 1
+        parts.append("")  # Terminate the last line
+        self.text = "\n".join(parts)
+
+    def __len__(self) -> int:
+        return len(self.file_offsets)
+
+    def file_at(self, pos: int) -> Optional[str]:
+        """Return the file that `pos` in `text` belongs to."""
+        # bisect_right skips past files without added lines that share an offset
+        i = bisect_right(self.file_offsets, pos) - 1
+        if i < 0:
+            return None
+        return self.file_names[i]
+
+    def line_at(self, pos: int) -> Optional[int]:
+        """Return the new-side line number of the added line containing `pos`."""
+        i = bisect_right(self.line_offsets, pos) - 1
+        if i < 0:
+            return None
+        return self.line_numbers[i]
+
+    def file_spans(self) -> list[tuple[int, int]]:
+        """(start, end) range of each file's added lines in `text`."""
+        ends = self.file_offsets[1:] + [len(self.text)]
+        return list(zip(self.file_offsets, ends))
@@ -0,0 +1,296 @@
+import io
+import re
+from dataclasses import dataclass, field
+from typing import Iterable, Iterator, Optional
+
+
+HUNK_HEADER_RE = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@ ?(.*)$")
+INDEX_RE = re.compile(r"^index ([0-9a-f]+)\.\.([0-9a-f]+)")
+
+ADDED = "+"
+REMOVED = "-"
+CONTEXT = " "
+
+
+@dataclass
+class DiffLine:
+    """A single line inside a hunk."""
+    kind: str  # ADDED, REMOVED or CONTEXT
+    content: str
+    old_lineno: Optional[int] = None
+    new_lineno: Optional[int] = None
+
+
+@dataclass
+class DiffHunk:
+    """A `@@ ... @@` block and its lines."""
+    old_start: int
+    old_count: int
+    new_start: int
+    new_count: int
+    section: str = ""  # Text after the closing @@, usually the enclosing function
+    lines: list[DiffLine] = field(default_factory=list)
+
+
+@dataclass
+class DiffFile:
+    """All hunks for one file in a unified diff."""
+    old_path: Optional[str] = None  # None for added files
+    new_path: Optional[str] = None  # None for deleted files
+    hunks: list[DiffHunk] = field(default_factory=list)
+    is_binary: bool = False
+    old_blob: Optional[str] = None  # Abbreviated blob ids from the `index` line
+    new_blob: Optional[str] = None
+
+    @property
+    def path(self) -> str:
+        return self.new_path or self.old_path or ""
+
+    def added_lines(self) -> Iterator[DiffLine]:
+        for hunk in self.hunks:
+            for line in hunk.lines:
+                if line.kind == ADDED:
+                    yield line
+
+
+def _strip_prefix(path: str) -> Optional[str]:
+    """Turn `a/foo.py` / `b/foo.py` / `/dev/null` into a repo path."""
+    path = path.split("\t", 1)[0].strip()
+    if path == "/dev/null":
+        return None
+    if path.startswith(("a/", "b/")):
+        return path[2:]
+    return path
+
+
+def parse_diff(diff: str | Iterable[str]) -> Iterator[DiffFile]:
+    """
+    Parse a unified diff, yielding one DiffFile at a time.
+
+    Accepts the whole diff as a string or any iterable of lines (e.g. a
+    streamed response), so callers can start on the first file before the
+    rest has been read. Handles `git diff` output as well as plain `diff -u`.
+    """
+    lines = io.StringIO(diff) if isinstance(diff, str) else diff
+
+    current: Optional[DiffFile] = None
+    hunk: Optional[DiffHunk] = None
+    old_left = new_left = 0
+    old_no = new_no = 0
+    seen_old_header = False  # Whether the current file already had its `---` line
+
+    for raw in lines:
+        line = raw.rstrip("\r\n")
+
+        # Inside a hunk every line is content until both sides are consumed
+        if hunk is not None and (old_left > 0 or new_left > 0):
+            kind = line[:1] or CONTEXT
+            if kind == ADDED:
+                hunk.lines.append(DiffLine(ADDED, line[1:], new_lineno=new_no))
+                new_no += 1
+                new_left -= 1
+                continue
+            if kind == REMOVED:
+                hunk.lines.append(DiffLine(REMOVED, line[1:], old_lineno=old_no))
+                old_no += 1
+                old_left -= 1
+                continue
+            if kind == CONTEXT:
+                hunk.lines.append(DiffLine(CONTEXT, line[1:], old_lineno=old_no, new_lineno=new_no))
+                old_no += 1
+                new_no += 1
+                old_left -= 1
+                new_left -= 1
+                continue
+            if kind == "\\":  # "\ No newline at end of file"
+                continue
+            # Hunk ended early (malformed counts): treat the line as a header
+            hunk = None
+            old_left = new_left = 0
+
+        if line.startswith("diff --git "):
+            if current is not None:
+                yield current
+            current = DiffFile()
+            hunk = None
+            seen_old_header = False
+            parts = line[len("diff --git "):].split(" b/", 1)
+            if len(parts) == 2:
+                current.old_path = _strip_prefix(parts[0])
+                current.new_path = parts[1]
+            continue
+
+        if line.startswith("--- "):
+            # Plain `diff -u` output has no `diff --git` line to start a file
+            if current is None or current.hunks or seen_old_header:
+                if current is not None:
+                    yield current
+                current = DiffFile()
+            hunk = None
+            seen_old_header = True
+            current.old_path = _strip_prefix(line[4:])
+            continue
+
+        if current is None:
+            continue
+
+        if line.startswith("+++ "):
+            current.new_path = _strip_prefix(line[4:])
+            continue
+
+        match = HUNK_HEADER_RE.match(line)
+        if match:
+            old_start, old_count, new_start, new_count, section = match.groups()
+            hunk = DiffHunk(
+                old_start=int(old_start),
+                old_count=int(old_count) if old_count is not None else 1,
+                new_start=int(new_start),
+                new_count=int(new_count) if new_count is not None else 1,
+                section=section,
+            )
+            current.hunks.append(hunk)
+            old_no, new_no = hunk.old_start, hunk.new_start
+            old_left, new_left = hunk.old_count, hunk.new_count
+            continue
+
+        index = INDEX_RE.match(line)
+        if index:
+            current.old_blob, current.new_blob = index.groups()
+        elif line.startswith("new file mode"):
+            current.old_path = None
+        elif line.startswith("deleted file mode"):
+            current.new_path = None
+        elif line.startswith("rename from "):
+            current.old_path = line[len("rename from "):]
+        elif line.startswith("rename to "):
+            current.new_path = line[len("rename to "):]
+        elif line.startswith("Binary files ") or line.startswith("GIT binary patch"):
+            current.is_binary = True
+
+    if current is not None:
+        yield current
+
+
+def diff_sections(diff: str) -> list[str]:
+    """
+    Split a diff into the raw text of each file. Files start at `diff --git`
+    lines, or for plain `diff -u` output at a `---` line followed by `+++`.
+    Anything before the first file is its own leading section.
+    """
+    lines = diff.splitlines(keepends=True)
+    git = any(line.startswith("diff --git ") for line in lines)
+    sections: list[list[str]] = []
+    for i, line in enumerate(lines):
+        if git:
+            starts = line.startswith("diff --git ")
+        else:
+            starts = line.startswith("--- ") and i + 1 < len(lines) and lines[i + 1].startswith("+++ ")
+        if starts or not sections:
+            sections.append([])
+        sections[-1].append(line)
+    return ["".join(section) for section in sections]
+
+
+def filter_diff(diff: str, paths: set[str]) -> str:
+    """
+    Keep only the `diff --git` sections touching one of `paths` (old or new
+    name). Diffs without git headers are returned unchanged.
+    """
+    sections = diff_sections(diff)
+    if not sections or not sections[0].startswith("diff --git "):
+        return diff
+
+    kept = []
+    for text in sections:
+        for f in parse_diff(text):
+            if f.old_path in paths or f.new_path in paths:
+                kept.append(text)
+            break
+    return "".join(kept)
+
+
+def _split_hunk(lines: list[str], budget: int) -> list[str]:
+    """
+    Cut one hunk (header line first) between lines into pieces of about
+    `budget` chars, each with its own header so it still parses as a hunk.
+    """
+    match = HUNK_HEADER_RE.match(lines[0].rstrip("\r\n"))
+    if match is None:
+        return ["".join(lines)]
+    old_no, _, new_no, _, section = match.groups()
+    old_no, new_no = int(old_no), int(new_no)
+    section = f" {section}" if section else ""
+    budget = max(1, budget - len(lines[0]))
+
+    pieces = []
+    body: list[str] = []
+    size = old_count = new_count = 0
+    for line in lines[1:] + [None]:  # Sentinel flushes the last piece
+        if body and (line is None or size + len(line) > budget):
+            header = f"@@ -{old_no},{old_count} +{new_no},{new_count} @@{section}\n"
+            pieces.append(header + "".join(body))
+            old_no += old_count
+            new_no += new_count
+            body, size, old_count, new_count = [], 0, 0, 0
+        if line is None:
+            break
+        body.append(line)
+        size += len(line)
+        kind = line[:1]
+        if kind in (CONTEXT, REMOVED, "\n", "\r", ""):
+            old_count += 1
+        if kind in (CONTEXT, ADDED, "\n", "\r", ""):
+            new_count += 1
+    return pieces or ["".join(lines)]
+
+
+def _split_section(section: str, max_chars: int) -> list[str]:
+    """Split one file's diff between hunks, repeating the file header in each piece."""
+    lines = section.splitlines(keepends=True)
+    first_hunk = next((i for i, line in enumerate(lines) if line.startswith("@@")), len(lines))
+    header = "".join(lines[:first_hunk])
+    budget = max(1, max_chars - len(header))
+
+    # Hunks, with any single hunk over budget cut between lines
+    hunks: list[list[str]] = []
+    for line in lines[first_hunk:]:
+        if line.startswith("@@") or not hunks:
+            hunks.append([])
+        hunks[-1].append(line)
+    blocks: list[str] = []
+    for hunk in hunks:
+        text = "".join(hunk)
+        blocks.extend([text] if len(text) <= budget else _split_hunk(hunk, budget))
+
+    pieces = []
+    body = ""
+    for block in blocks:
+        if body and len(body) + len(block) > budget:
+            pieces.append(header + body)
+            body = ""
+        body += block
+    if body or not pieces:
+        pieces.append(header + body)
+    return pieces
+
+
+def split_diff(diff: str, max_chars: int) -> list[str]:
+    """
+    Split a diff into chunks of about `max_chars` for separate review.
+
+    Chunks break between files where possible. A file too large for one
+    chunk is split between hunks, and each piece repeats its header so it
+    still reads as a valid diff of that file.
+    """
+    chunks = []
+    current = ""
+    for section in diff_sections(diff):
+        pieces = [section] if len(section) <= max_chars else _split_section(section, max_chars)
+        for piece in pieces:
+            if current and len(current) + len(piece) > max_chars:
+                chunks.append(current)
+                current = ""
+            current += piece
+    if current:
+        chunks.append(current)
+    return chunks
@@ -0,0 +1,83 @@
+import abc
+import asyncio
+import importlib
+from collections import defaultdict
+from contextlib import asynccontextmanager
+from functools import lru_cache
+from typing import Any, AsyncContextManager
+
+from ..config import get_settings
+
+
+class EventBroker(abc.ABC):
+    """
+    Fans out run progress events ("status", "stage", "finding") to
+    subscribers. Events are `(event, data)` tuples.
+
+    Subclass and point EVENT_BROKER at it (`module:Class`) to broadcast
+    across nodes, e.g. over Redis pub/sub or Postgres LISTEN/NOTIFY.
+    """
+
+    @abc.abstractmethod
+    async def publish(self, run_id: int, event: str, data: Any):
+        """Deliver an event to the run's current subscribers."""
+
+    @abc.abstractmethod
+    def subscribe(self, run_id: int) -> AsyncContextManager[asyncio.Queue]:
+        """Async context manager yielding a queue of the run's events."""
+
+    def stats(self) -> dict:
+        return {}
+
+
+class InProcessBroker(EventBroker):
+    """
+    Delivers events to subscribers in this process only; enough when the
+    analyses run in the API process (EMBEDDED_WORKER).
+    """
+
+    def __init__(self, queue_size: int = 256):
+        self.queue_size = queue_size
+        self._subscribers: dict[int, set[asyncio.Queue]] = defaultdict(set)
+        self.published = 0
+        self.dropped = 0
+
+    async def publish(self, run_id: int, event: str, data: Any):
+        self.published += 1
+        for queue in list(self._subscribers.get(run_id, ())):
+            if queue.full():
+                # Slow subscriber: lose the oldest event, never the latest status
+                queue.get_nowait()
+                self.dropped += 1
+            queue.put_nowait((event, data))
+
+    @asynccontextmanager
+    async def subscribe(self, run_id: int):
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers[run_id].add(queue)
+        try:
+            yield queue
+        finally:
+            subscribers = self._subscribers.get(run_id)
+            if subscribers is not None:
+                subscribers.discard(queue)
+                if not subscribers:
+                    del self._subscribers[run_id]
+
+    def stats(self) -> dict:
+        return {
+            "runs": len(self._subscribers),
+            "subscribers": sum(len(s) for s in self._subscribers.values()),
+            "published": self.published,
+            "dropped": self.dropped,
+        }
+
+
+@lru_cache()
+def get_event_broker() -> EventBroker:
+    """The configured event broker; in-process unless EVENT_BROKER names a class."""
+    path = get_settings().event_broker
+    if not path or path == "memory":
+        return InProcessBroker()
+    module, _, name = path.partition(":")
+    return getattr(importlib.import_module(module), name)()
@@ -0,0 +1,142 @@
+import asyncio
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from functools import lru_cache, partial
+
+from ..config import get_settings
+from ..models.database import SessionLocal, is_sqlite
+
+
+class BoundedExecutor:
+    """
+    Runs blocking, CPU-bound work off the event loop.
+
+    At most `max_workers` jobs run at once; the rest wait in the pool's queue.
+    Queue and run times are tracked so saturation shows up in /metrics.
+    """
+
+    def __init__(self, max_workers: int, name: str = "analysis"):
+        self.max_workers = max_workers
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._completed = 0
+        self._queue_time_total = 0.0
+        self._queue_time_max = 0.0
+        self._run_time_total = 0.0
+
+    async def run(self, func, *args, **kwargs):
+        """Run `func(*args, **kwargs)` in the pool and await its result."""
+        loop = asyncio.get_running_loop()
+        with self._lock:
+            self._queued += 1
+        return await loop.run_in_executor(
+            self._pool, self._timed, time.perf_counter(), partial(func, *args, **kwargs)
+        )
+
+    def _timed(self, submitted: float, call):
+        started = time.perf_counter()
+        waited = started - submitted
+        with self._lock:
+            self._queued -= 1
+            self._running += 1
+            self._queue_time_total += waited
+            self._queue_time_max = max(self._queue_time_max, waited)
+        try:
+            return call()
+        finally:
+            with self._lock:
+                self._running -= 1
+                self._completed += 1
+                self._run_time_total += time.perf_counter() - started
+
+    def stats(self) -> dict:
+        """Snapshot of queue depth and timing counters."""
+        with self._lock:
+            done = self._completed or 1
+            return {
+                "max_workers": self.max_workers,
+                "queued": self._queued,
+                "running": self._running,
+                "completed": self._completed,
+                "avg_queue_seconds": round(self._queue_time_total / done, 4),
+                "max_queue_seconds": round(self._queue_time_max, 4),
+                "avg_run_seconds": round(self._run_time_total / done, 4),
+            }
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+@lru_cache()
+def get_analysis_executor() -> BoundedExecutor:
+    """Executor for CPU-bound analysis stages (parsing, heuristics, markdown)."""
+    settings = get_settings()
+    return BoundedExecutor(max_workers=settings.analysis_max_concurrency)
+
+
+async def run_cpu_bound(func, *args, **kwargs):
+    """Run a CPU-bound callable on the analysis executor."""
+    return await get_analysis_executor().run(func, *args, **kwargs)
+
+
+@lru_cache()
+def get_db_writer() -> BoundedExecutor:
+    """
+    Executor for the worker's database writes (run status, partial findings,
+    job leases, cache entries). On SQLite it has a single thread, so writes
+    queue here in order instead of contending for the database's write lock.
+    """
+    settings = get_settings()
+    if is_sqlite(settings.database_url) and settings.sqlite_single_writer:
+        return BoundedExecutor(max_workers=1, name="db-writer")
+    return BoundedExecutor(max_workers=settings.database_pool_size, name="db-writer")
+
+
+def _write(func, *args):
+    db = SessionLocal()
+    try:
+        result = func(db, *args)
+        db.commit()
+        return result
+    except BaseException:
+        db.rollback()
+        raise
+    finally:
+        db.close()
+
+
+async def run_db_write(func, *args):
+    """Run `func(db, *args)` in a new session on the database writer, then commit."""
+    return await get_db_writer().run(_write, func, *args)
+
+
+@lru_cache()
+def get_scan_pool() -> ProcessPoolExecutor:
+    """
+    Process pool for sharded heuristic scans, created on first use. By then
+    the thread pools are running, so workers are started by a forkserver
+    (or spawned) rather than forked from this multi-threaded process.
+    """
+    settings = get_settings()
+    method = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+    return ProcessPoolExecutor(
+        max_workers=settings.heuristic_scan_workers,
+        mp_context=multiprocessing.get_context(method),
+    )
+
+
+def shutdown_executors():
+    """Shut down any executors that were started. Called on app shutdown."""
+    if get_analysis_executor.cache_info().currsize:
+        get_analysis_executor().shutdown()
+        get_analysis_executor.cache_clear()
+    if get_db_writer.cache_info().currsize:
+        get_db_writer().shutdown()
+        get_db_writer.cache_clear()
+    if get_scan_pool.cache_info().currsize:
+        get_scan_pool().shutdown(cancel_futures=True)
+        get_scan_pool.cache_clear()
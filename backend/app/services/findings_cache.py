@@ -0,0 +1,100 @@
+import asyncio
+import hashlib
+from functools import lru_cache
+from typing import Optional
+
+from sqlalchemy import select, delete
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..config import get_settings
+from ..models.analysis import FileFindings
+from ..models.database import SessionLocal
+from .executors import get_db_writer
+
+# Keep IN (...) lists well under SQLite's bound-parameter limit
+_BATCH = 500
+
+
+class FileFindingsCache:
+    """
+    Per-file heuristic scan results, stored in the database.
+
+    Entries are keyed by the file's blob SHA, its added lines and the rule
+    set version. The blob identifies the file's content; the added lines are
+    part of the key because findings only cover what the diff adds, which
+    also depends on the base. Files that are byte-identical between runs
+    (rebases, force-pushes, the same change in another PR) are not rescanned.
+    """
+
+    def __init__(self, max_entries: int = 50000):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(blob_sha: str, added_text: str, rules_version: str) -> str:
+        digest = hashlib.sha256(added_text.encode()).hexdigest()
+        return f"{rules_version}:{blob_sha}:{digest}"
+
+    async def get_many(self, keys: list[str]) -> dict[str, list]:
+        found = await asyncio.to_thread(self._get_many, keys)
+        self.hits += len(found)
+        self.misses += len(set(keys)) - len(found)
+        return found
+
+    async def put_many(self, entries: dict[str, list]):
+        await get_db_writer().run(self._put_many, entries)
+
+    def _get_many(self, keys: list[str]) -> dict[str, list]:
+        found = {}
+        db = SessionLocal()
+        try:
+            for i in range(0, len(keys), _BATCH):
+                rows = db.execute(
+                    select(FileFindings.cache_key, FileFindings.matches)
+                    .where(FileFindings.cache_key.in_(keys[i:i + _BATCH]))
+                )
+                found.update({key: matches for key, matches in rows})
+            return found
+        finally:
+            db.close()
+
+    def _put_many(self, entries: dict[str, list]):
+        db = SessionLocal()
+        try:
+            db.add_all(FileFindings(cache_key=key, matches=matches) for key, matches in entries.items())
+            db.commit()
+        except IntegrityError:
+            # Another worker stored some of these first; store the rest
+            db.rollback()
+            existing = self._get_many(list(entries))
+            db.add_all(
+                FileFindings(cache_key=key, matches=matches)
+                for key, matches in entries.items() if key not in existing
+            )
+            try:
+                db.commit()
+            except IntegrityError:
+                db.rollback()
+        finally:
+            db.close()
+
+    def evict(self, db: Session) -> int:
+        """Drop the oldest entries beyond `max_entries`."""
+        newest = select(FileFindings.id).order_by(FileFindings.id.desc()).limit(self.max_entries)
+        evicted = db.execute(delete(FileFindings).where(FileFindings.id.not_in(newest))).rowcount
+        db.commit()
+        return evicted
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
+
+
+@lru_cache()
+def get_findings_cache() -> Optional[FileFindingsCache]:
+    """The configured findings cache, or None when disabled."""
+    settings = get_settings()
+    if not settings.file_findings_cache_enabled:
+        return None
+    return FileFindingsCache(max_entries=settings.file_findings_cache_max_entries)
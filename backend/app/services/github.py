@@ -1,8 +1,13 @@
+import asyncio
+import hashlib
 import httpx
 import re
-from typing import Optional
+from typing import AsyncIterator, Optional
 from dataclasses import dataclass
-from ..config import get_settings
+from fastapi import Request
+from ..config import get_settings, Settings
+from .http_cache import CachedResponse, ResponseCache
+from .rate_limit import GitHubRateLimiter
 
 
 @dataclass
@@ -18,27 +23,185 @@ class PRData:
     base_branch: str
     head_branch: str
     diff: str
-    files: list[dict]
-    commits: list[dict]
+    files: list[dict]  # filename, sha, status and changes of each changed file
+    commits: list[str]  # Commit messages
     author: str
     created_at: str
     updated_at: str
 
 
+def create_github_client(settings: Optional[Settings] = None) -> httpx.AsyncClient:
+    """Create the pooled HTTP client shared by all GitHubService instances."""
+    settings = settings or get_settings()
+    http2 = settings.github_http2
+    if http2:
+        try:
+            import h2  # noqa: F401
+        except ImportError:
+            print("GITHUB_HTTP2 is set but the 'h2' package is not installed; using HTTP/1.1")
+            http2 = False
+    
+    return httpx.AsyncClient(
+        follow_redirects=True,
+        http2=http2,
+        limits=httpx.Limits(
+            max_connections=settings.github_max_connections,
+            max_keepalive_connections=settings.github_max_keepalive_connections,
+            keepalive_expiry=settings.github_keepalive_expiry,
+        ),
+    )
+
+
 class GitHubService:
     """Service for interacting with GitHub API."""
     
     BASE_URL = "https://api.github.com"
+    PER_PAGE = 100  # GitHub's maximum page size
     
-    def __init__(self, token: Optional[str] = None):
+    def __init__(
+        self,
+        token: Optional[str] = None,
+        client: Optional[httpx.AsyncClient] = None,
+        cache: Optional[ResponseCache] = None,
+        rate_limiter: Optional[GitHubRateLimiter] = None,
+    ):
         settings = get_settings()
         self.token = token or settings.github_token
+        self.page_concurrency = settings.github_page_concurrency
         self.headers = {
             "Accept": "application/vnd.github.v3+json",
             "User-Agent": "AI-PR-Code-Reviewer",
         }
         if self.token:
             self.headers["Authorization"] = f"Bearer {self.token}"
+        self._client = client
+        self._owns_client = False
+        self.cache = cache
+        self.rate_limiter = rate_limiter or GitHubRateLimiter.from_settings(settings)
+    
+    @property
+    def client(self) -> httpx.AsyncClient:
+        """The shared client, or a private one for use outside the app (e.g. scripts)."""
+        if self._client is None:
+            self._client = create_github_client()
+            self._owns_client = True
+        return self._client
+    
+    async def aclose(self):
+        """Close the client if this service created it."""
+        if self._owns_client and self._client is not None:
+            await self._client.aclose()
+            self._client = None
+            self._owns_client = False
+    
+    @property
+    def token_key(self) -> str:
+        """Stable, non-reversible identifier for this service's credentials."""
+        return hashlib.sha256(self.token.encode()).hexdigest()[:16] if self.token else "anon"
+    
+    def _cache_key(self, url: httpx.URL, headers: dict) -> str:
+        """Key a cached response by URL, representation and credentials."""
+        return f"{url}|{headers.get('Accept', '')}|{self.token_key}"
+    
+    async def _request(self, method: str, url: str, once: bool = False, **kwargs) -> httpx.Response:
+        """Send a request through the rate limiter for this token (see send_once for `once`)."""
+        send = self.rate_limiter.send_once if once else self.rate_limiter.send
+        return await send(
+            self.token_key,
+            lambda: self.client.request(method, url, **kwargs),
+        )
+    
+    async def _get(
+        self,
+        url: str,
+        headers: Optional[dict] = None,
+        params: Optional[dict] = None,
+        timeout: float = 30,
+        once: bool = False,
+    ) -> httpx.Response:
+        """
+        GET a GitHub API URL, revalidating against the response cache.
+        
+        Cached responses are sent with If-None-Match / If-Modified-Since; a 304
+        (which GitHub does not count against the rate limit) is answered from
+        the cache as if it were the original 200.
+        """
+        headers = headers or self.headers
+        if self.cache is None:
+            response = await self._request("GET", url, once=once, headers=headers, params=params, timeout=timeout)
+            response.raise_for_status()
+            return response
+        
+        key = self._cache_key(httpx.URL(url, params=params), headers)
+        cached = await self.cache.get(key)
+        if cached is not None:
+            headers = dict(headers)
+            if cached.etag:
+                headers["If-None-Match"] = cached.etag
+            if cached.last_modified:
+                headers["If-Modified-Since"] = cached.last_modified
+        
+        response = await self._request("GET", url, once=once, headers=headers, params=params, timeout=timeout)
+        if response.status_code == 304 and cached is not None:
+            self.cache.revalidated += 1
+            return httpx.Response(200, headers=cached.headers, content=cached.content, request=response.request)
+        response.raise_for_status()
+        
+        etag = response.headers.get("ETag")
+        last_modified = response.headers.get("Last-Modified")
+        if etag or last_modified:
+            self.cache.fetched += 1
+            await self.cache.set(key, CachedResponse(
+                etag=etag,
+                last_modified=last_modified,
+                content=response.content,
+                headers={
+                    name: response.headers[name]
+                    for name in ("Content-Type", "Link")
+                    if name in response.headers
+                },
+            ))
+        return response
+    
+    async def iter_pages(self, url: str, params: Optional[dict] = None) -> AsyncIterator[list]:
+        """
+        Yield every page of a paginated list endpoint, in order.
+        
+        The first page reveals the last page number through the Link header;
+        the remaining pages are then fetched concurrently (bounded by
+        github_page_concurrency) while earlier pages are already being yielded.
+        """
+        params = {**(params or {}), "per_page": self.PER_PAGE}
+        first = await self._get(url, params=params)
+        yield first.json()
+        
+        last_page = self._last_page(first)
+        if last_page <= 1:
+            return
+        
+        semaphore = asyncio.Semaphore(self.page_concurrency)
+        
+        async def fetch(page: int) -> list:
+            async with semaphore:
+                response = await self._get(url, params={**params, "page": page})
+                return response.json()
+        
+        tasks = [asyncio.create_task(fetch(page)) for page in range(2, last_page + 1)]
+        try:
+            for task in tasks:
+                yield await task
+        finally:
+            for task in tasks:
+                task.cancel()
+    
+    @staticmethod
+    def _last_page(response: httpx.Response) -> int:
+        """Read the last page number from a response's Link header."""
+        last = response.links.get("last", {}).get("url")
+        if not last:
+            return 1
+        page = httpx.URL(last).params.get("page")
+        return int(page) if page and page.isdigit() else 1
     
     @staticmethod
     def parse_pr_url(pr_url: str) -> tuple[str, str, int]:
@@ -58,60 +221,95 @@ class GitHubService:
     async def get_pr(self, owner: str, repo: str, pr_number: int) -> dict:
         """Fetch PR metadata."""
         url = f"{self.BASE_URL}/repos/{owner}/{repo}/pulls/{pr_number}"
-        async with httpx.AsyncClient(follow_redirects=True) as client:
-            response = await client.get(url, headers=self.headers, timeout=30)
-            response.raise_for_status()
-            return response.json()
+        response = await self._get(url)
+        return response.json()
+    
+    async def get_pr_head_sha(self, owner: str, repo: str, pr_number: int, timeout: float) -> Optional[str]:
+        """
+        The PR's head commit, or None if it can't be looked up within
+        `timeout` seconds. Never waits on the rate limiter or retries, so it
+        is safe to call while a client waits for the response.
+        """
+        url = f"{self.BASE_URL}/repos/{owner}/{repo}/pulls/{pr_number}"
+        try:
+            response = await asyncio.wait_for(self._get(url, timeout=timeout, once=True), timeout)
+        except (httpx.HTTPError, asyncio.TimeoutError):
+            return None
+        return response.json().get("head", {}).get("sha")
+    
+    async def compare_commits(self, owner: str, repo: str, base: str, head: str) -> dict:
+        """Compare two commits; includes `status` and the changed `files`."""
+        url = f"{self.BASE_URL}/repos/{owner}/{repo}/compare/{base}...{head}"
+        response = await self._get(url)
+        return response.json()
     
     async def get_pr_diff(self, owner: str, repo: str, pr_number: int) -> str:
         """Fetch the PR diff."""
         url = f"{self.BASE_URL}/repos/{owner}/{repo}/pulls/{pr_number}"
         headers = {**self.headers, "Accept": "application/vnd.github.v3.diff"}
-        async with httpx.AsyncClient(follow_redirects=True) as client:
-            response = await client.get(url, headers=headers, timeout=60)
-            response.raise_for_status()
-            return response.text
+        response = await self._get(url, headers=headers, timeout=60)
+        return response.text
+    
+    async def iter_pr_files(self, owner: str, repo: str, pr_number: int) -> AsyncIterator[dict]:
+        """Stream the files changed in the PR across all pages."""
+        url = f"{self.BASE_URL}/repos/{owner}/{repo}/pulls/{pr_number}/files"
+        async for page in self.iter_pages(url):
+            for item in page:
+                yield item
+    
+    async def iter_pr_commits(self, owner: str, repo: str, pr_number: int) -> AsyncIterator[dict]:
+        """Stream the commits in the PR across all pages."""
+        url = f"{self.BASE_URL}/repos/{owner}/{repo}/pulls/{pr_number}/commits"
+        async for page in self.iter_pages(url):
+            for item in page:
+                yield item
+    
+    @staticmethod
+    def _file_summary(item: dict) -> dict:
+        """The fields of a changed file the analysis uses; the patch is already in the diff."""
+        return {key: item[key] for key in ("filename", "sha", "status", "changes") if key in item}
+    
+    async def _pr_file_summaries(self, owner: str, repo: str, pr_number: int) -> list[dict]:
+        """Changed files, reduced to their summaries as each page arrives."""
+        return [self._file_summary(f) async for f in self.iter_pr_files(owner, repo, pr_number)]
+    
+    async def _pr_commit_messages(self, owner: str, repo: str, pr_number: int) -> list[str]:
+        """Commit messages, extracted as each page arrives."""
+        return [
+            c.get("commit", {}).get("message", "")
+            async for c in self.iter_pr_commits(owner, repo, pr_number)
+        ]
     
     async def get_pr_files(self, owner: str, repo: str, pr_number: int) -> list[dict]:
         """Fetch list of files changed in the PR."""
-        url = f"{self.BASE_URL}/repos/{owner}/{repo}/pulls/{pr_number}/files"
-        async with httpx.AsyncClient(follow_redirects=True) as client:
-            response = await client.get(url, headers=self.headers, timeout=30)
-            response.raise_for_status()
-            return response.json()
+        return [f async for f in self.iter_pr_files(owner, repo, pr_number)]
     
     async def get_pr_commits(self, owner: str, repo: str, pr_number: int) -> list[dict]:
         """Fetch commits in the PR."""
-        url = f"{self.BASE_URL}/repos/{owner}/{repo}/pulls/{pr_number}/commits"
-        async with httpx.AsyncClient(follow_redirects=True) as client:
-            response = await client.get(url, headers=self.headers, timeout=30)
-            response.raise_for_status()
-            return response.json()
+        return [c async for c in self.iter_pr_commits(owner, repo, pr_number)]
     
     async def get_file_content(self, owner: str, repo: str, path: str, ref: str) -> str:
         """Fetch content of a specific file at a given ref."""
         url = f"{self.BASE_URL}/repos/{owner}/{repo}/contents/{path}"
         params = {"ref": ref}
-        async with httpx.AsyncClient(follow_redirects=True) as client:
-            response = await client.get(url, headers=self.headers, params=params, timeout=30)
-            response.raise_for_status()
-            data = response.json()
-            if data.get("encoding") == "base64":
-                import base64
-                return base64.b64decode(data["content"]).decode("utf-8")
-            return data.get("content", "")
+        response = await self._get(url, params=params)
+        data = response.json()
+        if data.get("encoding") == "base64":
+            import base64
+            return base64.b64decode(data["content"]).decode("utf-8")
+        return data.get("content", "")
     
     async def fetch_pr_data(self, pr_url: str) -> PRData:
         """Fetch all relevant PR data in one call."""
         owner, repo, pr_number = self.parse_pr_url(pr_url)
         
-        # Fetch all data concurrently
-        import asyncio
+        # Fetch all data concurrently; file and commit pages are normalized
+        # as they arrive instead of holding every raw page until the end
         pr_info, diff, files, commits = await asyncio.gather(
             self.get_pr(owner, repo, pr_number),
             self.get_pr_diff(owner, repo, pr_number),
-            self.get_pr_files(owner, repo, pr_number),
-            self.get_pr_commits(owner, repo, pr_number),
+            self._pr_file_summaries(owner, repo, pr_number),
+            self._pr_commit_messages(owner, repo, pr_number),
         )
         
         return PRData(
@@ -135,15 +333,15 @@ class GitHubService:
     async def post_comment(self, owner: str, repo: str, pr_number: int, body: str) -> dict:
         """Post a comment to a PR."""
         url = f"{self.BASE_URL}/repos/{owner}/{repo}/issues/{pr_number}/comments"
-        async with httpx.AsyncClient(follow_redirects=True) as client:
-            response = await client.post(
-                url,
-                headers=self.headers,
-                json={"body": body},
-                timeout=30
-            )
-            response.raise_for_status()
-            return response.json()
+        response = await self._request(
+            "POST",
+            url,
+            headers=self.headers,
+            json={"body": body},
+            timeout=30
+        )
+        response.raise_for_status()
+        return response.json()
     
     async def get_repo_file(self, owner: str, repo: str, path: str, ref: str = "main") -> Optional[str]:
         """Try to fetch a file from the repo (e.g., review_rules.yml)."""
@@ -151,3 +349,12 @@ class GitHubService:
             return await self.get_file_content(owner, repo, path, ref)
         except httpx.HTTPStatusError:
             return None
+
+
+def get_github_service(request: Request) -> GitHubService:
+    """Dependency that provides a GitHubService on the app-wide HTTP client."""
+    return GitHubService(
+        client=request.app.state.github_client,
+        cache=request.app.state.github_cache,
+        rate_limiter=request.app.state.github_rate_limiter,
+    )
@@ -0,0 +1,185 @@
+import abc
+import asyncio
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Optional
+
+from ..config import get_settings, Settings
+
+
+@dataclass
+class CachedResponse:
+    """Validators and body of a previously fetched GitHub response."""
+    etag: Optional[str]
+    last_modified: Optional[str]
+    content: bytes
+    headers: dict[str, str] = field(default_factory=dict)  # Headers needed to decode content
+    stored_at: float = field(default_factory=time.time)
+
+
+class ResponseCache(abc.ABC):
+    """
+    Base class for conditional-request caches.
+
+    Counters are updated by GitHubService: `revalidated` counts 304s served
+    from the cache (free against the rate limit), `fetched` counts full
+    responses stored.
+    """
+
+    def __init__(self):
+        self.revalidated = 0
+        self.fetched = 0
+
+    @abc.abstractmethod
+    async def get(self, key: str) -> Optional[CachedResponse]:
+        """Cached response for `key`, or None."""
+
+    @abc.abstractmethod
+    async def set(self, key: str, entry: CachedResponse):
+        """Store (or replace) the response for `key`."""
+
+    def stats(self) -> dict:
+        return {"revalidated": self.revalidated, "fetched": self.fetched}
+
+    def close(self):
+        pass
+
+
+class MemoryResponseCache(ResponseCache):
+    """
+    In-process LRU cache, bounded by entry count and by total body size.
+
+    Bodies over `max_entry_bytes` (e.g. the diff of a huge PR) are not kept
+    in memory at all; with a SQLite tier they are still cached there.
+    """
+
+    def __init__(self, max_entries: int = 512, max_bytes: int = 64 * 1024 * 1024, max_entry_bytes: int = 4 * 1024 * 1024):
+        super().__init__()
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_entry_bytes = min(max_entry_bytes, max_bytes)
+        self._entries: OrderedDict[str, CachedResponse] = OrderedDict()
+        self._bytes = 0
+        self.skipped = 0  # Responses too large to keep in memory
+
+    async def get(self, key: str) -> Optional[CachedResponse]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    async def set(self, key: str, entry: CachedResponse):
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= len(old.content)
+        if len(entry.content) > self.max_entry_bytes:
+            self.skipped += 1
+            return
+        self._entries[key] = entry
+        self._bytes += len(entry.content)
+        while len(self._entries) > self.max_entries or self._bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._bytes -= len(evicted.content)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> dict:
+        return {**super().stats(), "entries": len(self), "bytes": self._bytes, "skipped": self.skipped}
+
+
+class SQLiteResponseCache(ResponseCache):
+    """Persistent cache in a local SQLite file, so validators survive restarts."""
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS http_cache ("
+            " key TEXT PRIMARY KEY, etag TEXT, last_modified TEXT,"
+            " content BLOB, headers TEXT, stored_at REAL)"
+        )
+        self._conn.commit()
+
+    def _get(self, key: str) -> Optional[CachedResponse]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT etag, last_modified, content, headers, stored_at FROM http_cache WHERE key = ?",
+                (key,),
+            ).fetchone()
+        if row is None:
+            return None
+        etag, last_modified, content, headers, stored_at = row
+        return CachedResponse(etag, last_modified, content, json.loads(headers), stored_at)
+
+    def _set(self, key: str, entry: CachedResponse):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO http_cache VALUES (?, ?, ?, ?, ?, ?)",
+                (key, entry.etag, entry.last_modified, entry.content, json.dumps(entry.headers), entry.stored_at),
+            )
+            self._conn.commit()
+
+    async def get(self, key: str) -> Optional[CachedResponse]:
+        return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key: str, entry: CachedResponse):
+        await asyncio.to_thread(self._set, key, entry)
+
+    def close(self):
+        self._conn.close()
+
+
+class TieredResponseCache(ResponseCache):
+    """Memory LRU in front of a SQLite tier; SQLite hits are promoted to memory."""
+
+    def __init__(self, memory: MemoryResponseCache, disk: SQLiteResponseCache):
+        super().__init__()
+        self.memory = memory
+        self.disk = disk
+
+    async def get(self, key: str) -> Optional[CachedResponse]:
+        entry = await self.memory.get(key)
+        if entry is None:
+            entry = await self.disk.get(key)
+            if entry is not None:
+                await self.memory.set(key, entry)
+        return entry
+
+    async def set(self, key: str, entry: CachedResponse):
+        await self.memory.set(key, entry)
+        await self.disk.set(key, entry)
+
+    def stats(self) -> dict:
+        memory = self.memory.stats()
+        return {
+            **super().stats(),
+            "entries": memory["entries"],
+            "bytes": memory["bytes"],
+            "skipped": memory["skipped"],
+            "sqlite_path": self.disk.path,
+        }
+
+    def close(self):
+        self.disk.close()
+
+
+def create_response_cache(settings: Optional[Settings] = None) -> Optional[ResponseCache]:
+    """Build the cache configured in Settings, or None when caching is disabled."""
+    settings = settings or get_settings()
+    if not settings.github_cache_enabled:
+        return None
+    memory = MemoryResponseCache(
+        max_entries=settings.github_cache_max_entries,
+        max_bytes=int(settings.github_cache_max_mb * 1024 * 1024),
+        max_entry_bytes=int(settings.github_cache_max_entry_mb * 1024 * 1024),
+    )
+    if settings.github_cache_sqlite_path:
+        return TieredResponseCache(memory, SQLiteResponseCache(settings.github_cache_sqlite_path))
+    return memory
@@ -0,0 +1,177 @@
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from ..config import get_settings
+from ..models.analysis import AnalysisRun, AnalysisStatus
+from ..models.job import AnalysisJob, JobStatus
+
+
+class JobQueue:
+    """
+    Database-backed queue of analysis jobs.
+
+    Jobs live in the `analysis_jobs` table, so they survive restarts and can
+    be claimed by any number of worker processes. On Postgres a job is
+    claimed with `SELECT ... FOR UPDATE SKIP LOCKED`; SQLite has no row
+    locks, so there the claim is a compare-and-set UPDATE that only succeeds
+    while the job is still queued (SQLite serializes writers, making it
+    atomic). Workers hold a lease and renew it with heartbeat() while the
+    analysis runs; jobs whose lease expires (e.g. the worker died) are put
+    back in the queue.
+
+    complete(), fail(), release() and heartbeat() only apply while the
+    caller still holds the job's lease, so a worker whose lease expired
+    can't overwrite the job after another worker has claimed it.
+    """
+
+    def __init__(self, max_attempts: int = 3, lease_seconds: int = 900, retry_delay_seconds: int = 30):
+        self.max_attempts = max_attempts
+        self.lease_seconds = lease_seconds
+        self.retry_delay_seconds = retry_delay_seconds
+
+    def enqueue(self, db: Session, run_id: int, payload: dict) -> AnalysisJob:
+        """Add a job for `run_id`. The caller commits, together with the run."""
+        job = AnalysisJob(run_id=run_id, payload=payload, status=JobStatus.QUEUED)
+        db.add(job)
+        return job
+
+    def claim(self, db: Session, worker_id: str) -> Optional[AnalysisJob]:
+        """Claim the oldest available job for `worker_id`, or return None."""
+        if db.bind.dialect.name == "postgresql":
+            return self._claim_skip_locked(db, worker_id)
+        return self._claim_compare_and_set(db, worker_id)
+
+    def _available(self):
+        return (
+            select(AnalysisJob)
+            .where(AnalysisJob.status == JobStatus.QUEUED)
+            .where(AnalysisJob.available_at <= datetime.utcnow())
+            .order_by(AnalysisJob.id)
+        )
+
+    def _mark_claimed(self, job: AnalysisJob, worker_id: str):
+        job.status = JobStatus.RUNNING
+        job.locked_by = worker_id
+        job.locked_at = datetime.utcnow()
+        job.attempts = (job.attempts or 0) + 1
+
+    def _claim_skip_locked(self, db: Session, worker_id: str) -> Optional[AnalysisJob]:
+        job = db.execute(self._available().limit(1).with_for_update(skip_locked=True)).scalar_one_or_none()
+        if job is None:
+            db.rollback()
+            return None
+        self._mark_claimed(job, worker_id)
+        db.commit()
+        return job
+
+    def _claim_compare_and_set(self, db: Session, worker_id: str) -> Optional[AnalysisJob]:
+        # Another worker may win the race for a candidate; try the next few
+        candidates = db.execute(self._available().with_only_columns(AnalysisJob.id).limit(5)).scalars().all()
+        for job_id in candidates:
+            claimed = db.execute(
+                update(AnalysisJob)
+                .where(AnalysisJob.id == job_id, AnalysisJob.status == JobStatus.QUEUED)
+                .values(
+                    status=JobStatus.RUNNING,
+                    locked_by=worker_id,
+                    locked_at=datetime.utcnow(),
+                    attempts=AnalysisJob.attempts + 1,
+                )
+            )
+            db.commit()
+            if claimed.rowcount == 1:
+                return db.get(AnalysisJob, job_id)
+        return None
+
+    def _held(self, job: AnalysisJob):
+        """Filter for the job while still held by the worker that claimed it."""
+        return (
+            AnalysisJob.id == job.id,
+            AnalysisJob.locked_by == job.locked_by,
+            AnalysisJob.status == JobStatus.RUNNING,
+        )
+
+    def heartbeat(self, db: Session, job: AnalysisJob) -> bool:
+        """Renew the lease on a claimed job. Returns False if it was lost."""
+        renewed = db.execute(
+            update(AnalysisJob).where(*self._held(job)).values(locked_at=datetime.utcnow())
+        )
+        db.commit()
+        return renewed.rowcount == 1
+
+    def complete(self, db: Session, job: AnalysisJob) -> bool:
+        """Mark a claimed job done. Returns False if its lease was lost."""
+        done = db.execute(
+            update(AnalysisJob).where(*self._held(job)).values(status=JobStatus.DONE, locked_by=None)
+        )
+        db.commit()
+        return done.rowcount == 1
+
+    def fail(self, db: Session, job: AnalysisJob, error: str) -> bool:
+        """Record a failed attempt. Returns True if the job will be retried."""
+        retry = job.attempts < self.max_attempts
+        values = {"last_error": error, "locked_by": None}
+        if retry:
+            values["status"] = JobStatus.QUEUED
+            values["available_at"] = datetime.utcnow() + timedelta(seconds=self.retry_delay_seconds * job.attempts)
+        else:
+            values["status"] = JobStatus.FAILED
+        failed = db.execute(update(AnalysisJob).where(*self._held(job)).values(**values))
+        db.commit()
+        return retry and failed.rowcount == 1
+
+    def release(self, db: Session, job: AnalysisJob):
+        """Hand a job back without counting the attempt (e.g. worker shutting down)."""
+        db.execute(
+            update(AnalysisJob)
+            .where(*self._held(job))
+            .values(status=JobStatus.QUEUED, locked_by=None, attempts=AnalysisJob.attempts - 1)
+        )
+        db.commit()
+
+    def requeue_expired(self, db: Session) -> int:
+        """
+        Put jobs whose worker lease has expired (the worker died or hung) back
+        in the queue. Jobs already out of attempts fail along with their run.
+        """
+        now = datetime.utcnow()
+        expired = (
+            AnalysisJob.status == JobStatus.RUNNING,
+            AnalysisJob.locked_at < now - timedelta(seconds=self.lease_seconds),
+        )
+        exhausted = select(AnalysisJob.run_id).where(*expired, AnalysisJob.attempts >= self.max_attempts)
+        db.execute(
+            update(AnalysisRun)
+            .where(AnalysisRun.id.in_(exhausted))
+            .values(
+                status=AnalysisStatus.FAILED,
+                error_message="Analysis worker stopped responding",
+                completed_at=now,
+                inflight_key=None,
+            )
+        )
+        db.execute(
+            update(AnalysisJob)
+            .where(*expired, AnalysisJob.attempts >= self.max_attempts)
+            .values(status=JobStatus.FAILED, locked_by=None, last_error="Lease expired")
+        )
+        requeued = db.execute(
+            update(AnalysisJob)
+            .where(*expired)
+            .values(status=JobStatus.QUEUED, locked_by=None, available_at=now)
+        )
+        db.commit()
+        return requeued.rowcount
+
+
+@lru_cache()
+def get_job_queue() -> JobQueue:
+    settings = get_settings()
+    return JobQueue(
+        max_attempts=settings.job_max_attempts,
+        lease_seconds=settings.job_lease_seconds,
+    )
@@ -0,0 +1,72 @@
+import json
+from typing import Optional
+
+
+class JSONArrayStream:
+    """
+    Pulls complete elements out of one top-level array of a JSON object
+    while the document is still arriving, e.g. `"findings": [{...}, {...}`
+    from a streamed completion. Only object elements are returned.
+    """
+
+    def __init__(self, key: str):
+        self.key = key
+        self._buffer = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._last_string: Optional[str] = None
+        self._current_key: Optional[str] = None
+        self._array_depth = 0  # Depth inside the target array, 0 when outside it
+        self._element_start: Optional[int] = None
+
+    def feed(self, text: str) -> list[dict]:
+        """Add streamed text; returns the elements completed by it."""
+        self._buffer += text
+        buffer = self._buffer
+        completed = []
+        for i in range(self._pos, len(buffer)):
+            c = buffer[i]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif c == "\\":
+                    self._escape = True
+                elif c == '"':
+                    self._in_string = False
+                    if self._depth == 1:
+                        self._last_string = buffer[self._string_start + 1:i]
+                continue
+
+            if c == '"':
+                self._in_string = True
+                self._string_start = i
+            elif c == ":" and self._depth == 1:
+                self._current_key = self._last_string
+            elif c == "," and self._depth == 1:
+                self._current_key = None
+            elif c in "{[":
+                self._depth += 1
+                if c == "[" and self._depth == 2 and self._current_key == self.key:
+                    self._array_depth = 2
+                elif c == "{" and self._array_depth and self._depth == self._array_depth + 1:
+                    self._element_start = i
+            elif c in "}]":
+                if c == "}" and self._element_start is not None and self._depth == self._array_depth + 1:
+                    try:
+                        completed.append(json.loads(buffer[self._element_start:i + 1]))
+                    except ValueError:
+                        pass
+                    self._element_start = None
+                elif c == "]" and self._depth == self._array_depth:
+                    self._array_depth = 0
+                self._depth -= 1
+        self._pos = len(buffer)
+        return completed
+
+    @property
+    def text(self) -> str:
+        """Everything fed so far."""
+        return self._buffer
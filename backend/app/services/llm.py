@@ -0,0 +1,149 @@
+import asyncio
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Optional
+
+import httpx
+
+from ..config import get_settings, Settings
+from .prompt_budget import get_token_counter
+
+
+class LLMClient:
+    """
+    Process-wide OpenAI client.
+
+    Wraps one `openai.AsyncOpenAI` (and its HTTP connection pool) shared by
+    every analysis. At most `max_concurrency` completions are in flight at
+    once, and requests wait while the tokens sent in the last minute would
+    exceed `tokens_per_minute` (0 disables the limit), so bursts of chunked
+    reviews stay under the provider's TPM limit instead of drawing 429s.
+    """
+
+    def __init__(self, client, max_concurrency: int = 4, tokens_per_minute: int = 0):
+        self.client = client
+        self.max_concurrency = max_concurrency
+        self.tokens_per_minute = tokens_per_minute
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._lock = asyncio.Lock()
+        self._window: deque[list] = deque()  # [sent at, tokens] for the last minute
+        self.requests = 0
+        self.failures = 0
+        self.in_flight = 0
+        self.waiting = 0
+        self.tokens_used = 0
+        self.throttled_seconds = 0.0
+
+    @asynccontextmanager
+    async def _slot(self, tokens: int):
+        """Hold a concurrency slot with `tokens` reserved; yields the window entry."""
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        try:
+            entry = await self._reserve(tokens)
+            self.in_flight += 1
+            try:
+                yield entry
+            except Exception:
+                self.failures += 1
+                entry[1] = 0
+                raise
+            finally:
+                self.in_flight -= 1
+        finally:
+            self._semaphore.release()
+        self.requests += 1
+        self.tokens_used += entry[1]
+
+    async def chat(self, *, model: str, messages: list[dict], max_tokens: int, **kwargs):
+        """Create a chat completion within the concurrency and TPM limits."""
+        counter = get_token_counter(model)
+        # Output tokens count against TPM too; reserve the maximum up front
+        estimate = sum(counter.count(m["content"]) for m in messages) + max_tokens
+        async with self._slot(estimate) as entry:
+            response = await self.client.chat.completions.create(
+                model=model, messages=messages, max_tokens=max_tokens, **kwargs
+            )
+            usage = getattr(response, "usage", None)
+            if usage is not None:
+                entry[1] = usage.total_tokens
+        return response
+
+    async def chat_stream(self, *, model: str, messages: list[dict], max_tokens: int, **kwargs) -> AsyncIterator[str]:
+        """Like chat(), but yields the completion text as it is generated."""
+        counter = get_token_counter(model)
+        prompt_tokens = sum(counter.count(m["content"]) for m in messages)
+        async with self._slot(prompt_tokens + max_tokens) as entry:
+            stream = await self.client.chat.completions.create(
+                model=model, messages=messages, max_tokens=max_tokens, stream=True, **kwargs
+            )
+            output = []
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    output.append(chunk.choices[0].delta.content)
+                    yield output[-1]
+            # Streams carry no usage; count what was generated instead
+            entry[1] = prompt_tokens + counter.count("".join(output))
+
+    async def _reserve(self, tokens: int) -> list:
+        """Wait until `tokens` fit in the per-minute budget, then record them."""
+        async with self._lock:  # Waiters are served in order
+            while self.tokens_per_minute:
+                now = time.monotonic()
+                while self._window and self._window[0][0] <= now - 60:
+                    self._window.popleft()
+                used = sum(t for _, t in self._window)
+                # A request bigger than the whole budget goes once the window is empty
+                if used + tokens <= self.tokens_per_minute or not self._window:
+                    break
+                wait = self._window[0][0] + 60 - now
+                self.throttled_seconds += wait
+                await asyncio.sleep(wait)
+            entry = [time.monotonic(), tokens]
+            self._window.append(entry)
+            return entry
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "requests": self.requests,
+            "failures": self.failures,
+            "tokens_used": self.tokens_used,
+            "tokens_last_minute": sum(t for sent, t in self._window if sent > now - 60),
+            "tokens_per_minute": self.tokens_per_minute or None,
+            "throttled_seconds": round(self.throttled_seconds, 1),
+        }
+
+    async def aclose(self):
+        await self.client.close()
+
+
+def create_llm_client(settings: Optional[Settings] = None) -> Optional[LLMClient]:
+    """Build the shared LLM client, or None when no API key is configured."""
+    settings = settings or get_settings()
+    if not settings.openai_api_key:
+        return None
+    try:
+        import openai
+    except ImportError:
+        print("OPENAI_API_KEY is set but the 'openai' package is not installed; using heuristics")
+        return None
+    http_client = httpx.AsyncClient(
+        limits=httpx.Limits(
+            max_connections=settings.llm_max_concurrency,
+            max_keepalive_connections=settings.llm_max_concurrency,
+        ),
+    )
+    client = openai.AsyncOpenAI(api_key=settings.openai_api_key, http_client=http_client)
+    return LLMClient(
+        client,
+        max_concurrency=settings.llm_max_concurrency,
+        tokens_per_minute=settings.llm_tokens_per_minute,
+    )
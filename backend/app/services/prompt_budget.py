@@ -0,0 +1,203 @@
+import math
+import posixpath
+from functools import lru_cache
+from typing import Optional
+
+from .diff_parser import diff_sections, parse_diff, split_diff
+
+# Rough size of a token in source code and diffs, used when tiktoken is
+# not installed and for sizing diff chunks
+CHARS_PER_TOKEN = 4
+
+LOCKFILES = {
+    "package-lock.json", "yarn.lock", "pnpm-lock.yaml", "npm-shrinkwrap.json",
+    "poetry.lock", "pipfile.lock", "uv.lock", "cargo.lock", "go.sum",
+    "composer.lock", "gemfile.lock", "podfile.lock", "packages.lock.json",
+}
+GENERATED_SUFFIXES = (
+    ".min.js", ".min.css", ".map", ".snap", "_pb2.py", "_pb2_grpc.py",
+    ".pb.go", ".g.dart", ".designer.cs", ".svg",
+)
+GENERATED_DIRS = {"dist", "build", "vendor", "node_modules", "generated", "__generated__"}
+
+
+@lru_cache()
+def _warn_estimated_counts():
+    """Printed once per process: budgets are then only approximate."""
+    print("tiktoken is not installed; prompt budgets use estimated token counts")
+
+
+class TokenCounter:
+    """
+    Counts tokens for a model with tiktoken, and estimates from the
+    character count if it isn't installed.
+    """
+
+    def __init__(self, model: str):
+        self.model = model
+        self._encoding = None
+        try:
+            import tiktoken
+        except ImportError:
+            _warn_estimated_counts()
+            return
+        try:
+            self._encoding = tiktoken.encoding_for_model(model)
+        except KeyError:
+            self._encoding = tiktoken.get_encoding("o200k_base")
+
+    @property
+    def exact(self) -> bool:
+        return self._encoding is not None
+
+    def count(self, text: str) -> int:
+        if not text:
+            return 0
+        if self._encoding is None:
+            return math.ceil(len(text) / CHARS_PER_TOKEN)
+        return len(self._encoding.encode(text, disallowed_special=()))
+
+    def truncate(self, text: str, max_tokens: int) -> str:
+        """The longest prefix of `text` within `max_tokens`."""
+        if max_tokens <= 0:
+            return ""
+        if self._encoding is None:
+            return text[:max_tokens * CHARS_PER_TOKEN]
+        tokens = self._encoding.encode(text, disallowed_special=())
+        if len(tokens) <= max_tokens:
+            return text
+        return self._encoding.decode(tokens[:max_tokens])
+
+
+@lru_cache()
+def get_token_counter(model: str) -> TokenCounter:
+    return TokenCounter(model)
+
+
+def fit_lines(counter: TokenCounter, header: str, items: list[str], max_tokens: int) -> str:
+    """`header` followed by as many `- item` lines as fit, noting how many were left out."""
+    if not items:
+        return ""
+    text = header
+    used = counter.count(header)
+    for i, item in enumerate(items):
+        line = f"\n- {item}"
+        cost = counter.count(line)
+        if used + cost > max_tokens:
+            if i == 0:
+                return ""
+            return text + f"\n- ... and {len(items) - i} more"
+        text += line
+        used += cost
+    return text
+
+
+def low_signal_reason(path: str) -> Optional[str]:
+    """Why a file's diff is unlikely to matter to a reviewer, if it is."""
+    name = posixpath.basename(path).lower()
+    if name in LOCKFILES:
+        return "lockfile"
+    if name.endswith(GENERATED_SUFFIXES) or any(part in GENERATED_DIRS for part in path.lower().split("/")[:-1]):
+        return "generated"
+    return None
+
+
+def _is_whitespace_only(hunk_lines: list[str]) -> bool:
+    removed = "".join("".join(line[1:].split()) for line in hunk_lines if line.startswith("-"))
+    added = "".join("".join(line[1:].split()) for line in hunk_lines if line.startswith("+"))
+    return removed == added and any(line[:1] in ("+", "-") for line in hunk_lines)
+
+
+def _without_whitespace_hunks(section: str) -> tuple[str, int]:
+    """The section minus hunks that only change whitespace, and how many were dropped."""
+    lines = section.splitlines(keepends=True)
+    kept: list[str] = []
+    hunk: Optional[list[str]] = None
+    dropped = 0
+    for line in lines + ["@@"]:  # Sentinel flushes the last hunk
+        if line.startswith("@@"):
+            if hunk is not None:
+                if _is_whitespace_only(hunk[1:]):
+                    dropped += 1
+                else:
+                    kept.extend(hunk)
+            hunk = [line]
+        elif hunk is None:
+            kept.append(line)
+        else:
+            hunk.append(line)
+    return "".join(kept), dropped
+
+
+def drop_low_signal(diff: str) -> tuple[str, list[str]]:
+    """
+    Remove lockfiles, generated files and whitespace-only hunks from a diff.
+    Returns the remaining diff and a note for each thing left out.
+    """
+    kept = []
+    notes = []
+    for section in diff_sections(diff):
+        diff_file = next(parse_diff(section), None)
+        if diff_file is None or not diff_file.hunks:
+            kept.append(section)
+            continue
+        reason = low_signal_reason(diff_file.path)
+        if reason:
+            notes.append(f"{diff_file.path} ({reason})")
+            continue
+        trimmed, dropped = _without_whitespace_hunks(section)
+        if dropped == len(diff_file.hunks):
+            notes.append(f"{diff_file.path} (whitespace only)")
+            continue
+        if dropped:
+            notes.append(f"{dropped} whitespace-only hunk(s) in {diff_file.path}")
+        kept.append(trimmed)
+    return "".join(kept), notes
+
+
+def fit_diff(counter: TokenCounter, diff: str, max_tokens: int) -> str:
+    """
+    Fit a diff into `max_tokens`: low-signal changes go first, then whole
+    files from the end, and only then is the last file cut short.
+    """
+    if counter.count(diff) <= max_tokens:
+        return diff
+    diff, notes = drop_low_signal(diff)
+    omitted = f"\n[Omitted low-signal changes: {', '.join(notes)}]" if notes else ""
+    budget = max_tokens - counter.count(omitted)
+    if counter.count(diff) <= budget:
+        return diff + omitted
+
+    truncated = "\n\n[Diff truncated due to size...]"
+    budget -= counter.count(truncated)
+    text = ""
+    used = 0
+    for section in diff_sections(diff):
+        cost = counter.count(section)
+        if used + cost > budget:
+            text += counter.truncate(section, budget - used)
+            break
+        text += section
+        used += cost
+    return text + truncated + omitted
+
+
+def split_diff_tokens(counter: TokenCounter, diff: str, max_tokens: int) -> list[str]:
+    """
+    split_diff() by tokens: chunks of at most `max_tokens` each. Chunks
+    denser than CHARS_PER_TOKEN are split again; only a single line too
+    long for any chunk can still be over.
+    """
+    chunks = []
+    for chunk in split_diff(diff, max_tokens * CHARS_PER_TOKEN):
+        tokens = counter.count(chunk)
+        if tokens <= max_tokens:
+            chunks.append(chunk)
+            continue
+        smaller = split_diff(chunk, max(1, len(chunk) * max_tokens // tokens))
+        if len(smaller) == 1:
+            chunks.append(chunk)
+            continue
+        for part in smaller:
+            chunks.extend(split_diff_tokens(counter, part, max_tokens))
+    return chunks
@@ -0,0 +1,220 @@
+import asyncio
+import random
+import time
+from dataclasses import dataclass
+from typing import Awaitable, Callable, Optional
+
+import httpx
+
+from ..config import get_settings, Settings
+
+
+RETRYABLE_STATUSES = {429, 500, 502, 503, 504}
+
+
+class RateLimitExceeded(httpx.HTTPError):
+    """The token's remaining budget can't serve a request within `max_wait`."""
+
+
+@dataclass
+class RateLimitBudget:
+    """What GitHub last told us about one token's rate limit."""
+    limit: Optional[int] = None
+    remaining: Optional[int] = None
+    reset_at: Optional[float] = None  # Unix time the window resets
+    blocked_until: float = 0.0  # Set from Retry-After / secondary limits
+    next_send_at: float = 0.0  # Next free slot while pacing a low budget
+    in_flight: int = 0
+    waiting: int = 0
+    retries: int = 0
+    throttled_seconds: float = 0.0
+
+
+class GitHubRateLimiter:
+    """
+    Schedules outbound GitHub requests per token.
+
+    Tracks X-RateLimit-* and Retry-After from every response, caps
+    concurrent requests per token, spreads the remaining budget over the
+    time left in the window once it runs low, and retries rate-limited or
+    transient failures with jittered exponential backoff. Waits longer than
+    `max_wait` are not taken, so an analysis never hangs indefinitely: a
+    blocked request goes out anyway, and one whose paced slot is further
+    away than that raises RateLimitExceeded.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = 10,
+        max_retries: int = 3,
+        backoff: float = 1.0,
+        reserve: int = 50,
+        max_wait: float = 120.0,
+    ):
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.reserve = reserve
+        self.max_wait = max_wait
+        self._budgets: dict[str, RateLimitBudget] = {}
+        self._semaphores: dict[str, asyncio.Semaphore] = {}
+
+    @classmethod
+    def from_settings(cls, settings: Optional[Settings] = None) -> "GitHubRateLimiter":
+        settings = settings or get_settings()
+        return cls(
+            max_concurrency=settings.github_max_concurrent_requests,
+            max_retries=settings.github_max_retries,
+            backoff=settings.github_retry_backoff,
+            reserve=settings.github_rate_limit_reserve,
+            max_wait=settings.github_rate_limit_max_wait,
+        )
+
+    def budget(self, token_key: str) -> RateLimitBudget:
+        if token_key not in self._budgets:
+            self._budgets[token_key] = RateLimitBudget()
+        return self._budgets[token_key]
+
+    async def send(self, token_key: str, request: Callable[[], Awaitable[httpx.Response]]) -> httpx.Response:
+        """Send a request for `token_key`, throttling and retrying as needed."""
+        budget = self.budget(token_key)
+        semaphore = self._semaphores.setdefault(token_key, asyncio.Semaphore(self.max_concurrency))
+
+        attempt = 0
+        while True:
+            budget.waiting += 1
+            acquired = False
+            try:
+                async with semaphore:
+                    budget.waiting -= 1
+                    acquired = True
+                    await self._throttle(budget)
+                    budget.in_flight += 1
+                    try:
+                        response = await request()
+                    except httpx.TransportError:
+                        if attempt >= self.max_retries:
+                            raise
+                        response = None
+                    finally:
+                        budget.in_flight -= 1
+            finally:
+                if not acquired:
+                    budget.waiting -= 1
+
+            if response is not None:
+                self._update(budget, response)
+                if not self._should_retry(response):
+                    return response
+
+            delay = self._retry_delay(budget, response, attempt)
+            if response is not None and (attempt >= self.max_retries or delay > self.max_wait):
+                return response
+            attempt += 1
+            budget.retries += 1
+            await asyncio.sleep(delay)
+
+    async def send_once(self, token_key: str, request: Callable[[], Awaitable[httpx.Response]]) -> httpx.Response:
+        """
+        Send a request right away, without waiting or retrying. Raises
+        RateLimitExceeded instead of waiting when the token is blocked, low
+        on budget or at its concurrency limit; for lookups that are only
+        worth doing if they are fast.
+        """
+        budget = self.budget(token_key)
+        semaphore = self._semaphores.setdefault(token_key, asyncio.Semaphore(self.max_concurrency))
+        now = time.time()
+        low = budget.remaining is not None and budget.remaining <= self.reserve and (budget.reset_at or 0) > now
+        if semaphore.locked() or budget.blocked_until > now or low:
+            raise RateLimitExceeded("GitHub requests for this token are being throttled")
+        async with semaphore:
+            budget.in_flight += 1
+            try:
+                response = await request()
+            finally:
+                budget.in_flight -= 1
+        self._update(budget, response)
+        return response
+
+    async def _throttle(self, budget: RateLimitBudget):
+        """Sleep before sending if the token is blocked or nearly out of budget."""
+        now = time.time()
+        wait = max(0.0, budget.blocked_until - now)
+        if budget.remaining is not None and budget.reset_at and budget.remaining <= self.reserve:
+            # Spread what's left evenly over the rest of the window: requests
+            # take consecutive slots one interval apart, rather than every
+            # concurrent request sleeping one interval and firing together.
+            # No await until the slot is taken, so this needs no lock.
+            interval = max(0.0, budget.reset_at - now) / max(budget.remaining, 1)
+            send_at = max(now + wait, budget.next_send_at)
+            if send_at - now > self.max_wait:
+                raise RateLimitExceeded(
+                    f"GitHub rate limit nearly exhausted ({budget.remaining} requests left "
+                    f"until reset in {budget.reset_at - now:.0f}s)"
+                )
+            budget.next_send_at = send_at + interval
+            wait = send_at - now
+        if 0 < wait <= self.max_wait:
+            budget.throttled_seconds += wait
+            await asyncio.sleep(wait)
+
+    def _update(self, budget: RateLimitBudget, response: httpx.Response):
+        headers = response.headers
+        if "X-RateLimit-Limit" in headers:
+            budget.limit = int(headers["X-RateLimit-Limit"])
+        if "X-RateLimit-Remaining" in headers:
+            budget.remaining = int(headers["X-RateLimit-Remaining"])
+        if "X-RateLimit-Reset" in headers:
+            budget.reset_at = float(headers["X-RateLimit-Reset"])
+        retry_after = self._retry_after(response)
+        if retry_after is not None:
+            budget.blocked_until = max(budget.blocked_until, time.time() + retry_after)
+
+    @staticmethod
+    def _retry_after(response: httpx.Response) -> Optional[float]:
+        value = response.headers.get("Retry-After")
+        if value is None:
+            return None
+        try:
+            return float(value)
+        except ValueError:
+            return None
+
+    @staticmethod
+    def _should_retry(response: httpx.Response) -> bool:
+        if response.status_code in RETRYABLE_STATUSES:
+            return True
+        # Primary and secondary rate limits come back as 403
+        if response.status_code == 403:
+            return (
+                response.headers.get("X-RateLimit-Remaining") == "0"
+                or "Retry-After" in response.headers
+            )
+        return False
+
+    def _retry_delay(self, budget: RateLimitBudget, response: Optional[httpx.Response], attempt: int) -> float:
+        if response is not None:
+            retry_after = self._retry_after(response)
+            if retry_after is not None:
+                return retry_after
+            if response.headers.get("X-RateLimit-Remaining") == "0" and budget.reset_at:
+                return max(0.0, budget.reset_at - time.time())
+        # Full jitter keeps concurrent retries from stampeding together
+        return random.uniform(0, self.backoff * (2 ** attempt))
+
+    def stats(self) -> dict:
+        """Current budget per token (keyed by a hash, never the token itself)."""
+        now = time.time()
+        return {
+            token_key: {
+                "limit": budget.limit,
+                "remaining": budget.remaining,
+                "reset_in_seconds": round(max(0.0, budget.reset_at - now), 1) if budget.reset_at else None,
+                "blocked_for_seconds": round(max(0.0, budget.blocked_until - now), 1),
+                "in_flight": budget.in_flight,
+                "waiting": budget.waiting,
+                "retries": budget.retries,
+                "throttled_seconds": round(budget.throttled_seconds, 1),
+            }
+            for token_key, budget in self._budgets.items()
+        }
@@ -0,0 +1,89 @@
+from datetime import datetime, timedelta
+from functools import lru_cache
+from typing import Optional
+
+from sqlalchemy import select, update
+from sqlalchemy.orm import Session
+
+from ..config import get_settings
+from ..models.analysis import AnalysisRun, AnalysisResult, AnalysisStatus
+
+
+class ResultCache:
+    """
+    Reuses stored reviews for analyses that were already done.
+
+    Results are content-addressed: `AnalysisResult.cache_key` identifies what
+    was reviewed (head SHA or diff hash, options including rules and language
+    hint, model version and heuristic rule set version), so a repeat
+    submission is answered by copying the earlier result instead of
+    re-running the pipeline. Entries older than `ttl_seconds` are not
+    reused, and only the newest `max_entries` keys are kept; evicted results
+    stay attached to their runs.
+    """
+
+    def __init__(self, ttl_seconds: int = 86400, max_entries: int = 10000):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+
+    def lookup(self, db: Session, key: Optional[str]) -> Optional[AnalysisResult]:
+        """Most recent fresh result stored under `key`, if any."""
+        if key is None:
+            return None
+        cutoff = datetime.utcnow() - timedelta(seconds=self.ttl_seconds)
+        return (
+            db.query(AnalysisResult)
+            .filter(AnalysisResult.cache_key == key, AnalysisResult.created_at >= cutoff)
+            .order_by(AnalysisResult.created_at.desc())
+            .first()
+        )
+
+    def complete_from(self, db: Session, run: AnalysisRun, cached: AnalysisResult) -> AnalysisResult:
+        """Complete `run` with a copy of `cached`. The caller commits."""
+        result = AnalysisResult(
+            run_id=run.id,
+            result_blob=cached.result_blob,
+            result_json=cached.result_json,
+            model_version=cached.model_version,
+            rules_version=cached.rules_version,
+            cache_hit=True,
+        )
+        db.add(result)
+        run.status = AnalysisStatus.COMPLETED
+        run.completed_at = datetime.utcnow()
+        run.inflight_key = None
+        return result
+
+    def evict(self, db: Session) -> int:
+        """Drop expired keys and any beyond `max_entries`, oldest first."""
+        cutoff = datetime.utcnow() - timedelta(seconds=self.ttl_seconds)
+        evicted = db.execute(
+            update(AnalysisResult)
+            .where(AnalysisResult.cache_key.is_not(None), AnalysisResult.created_at < cutoff)
+            .values(cache_key=None)
+        ).rowcount
+        newest = (
+            select(AnalysisResult.id)
+            .where(AnalysisResult.cache_key.is_not(None))
+            .order_by(AnalysisResult.created_at.desc())
+            .limit(self.max_entries)
+        )
+        evicted += db.execute(
+            update(AnalysisResult)
+            .where(AnalysisResult.cache_key.is_not(None), AnalysisResult.id.not_in(newest))
+            .values(cache_key=None)
+        ).rowcount
+        db.commit()
+        return evicted
+
+
+@lru_cache()
+def get_result_cache() -> Optional[ResultCache]:
+    """The configured result cache, or None when disabled."""
+    settings = get_settings()
+    if not settings.result_cache_enabled:
+        return None
+    return ResultCache(
+        ttl_seconds=settings.result_cache_ttl_seconds,
+        max_entries=settings.result_cache_max_entries,
+    )
@@ -0,0 +1,205 @@
+import hashlib
+import re
+from dataclasses import dataclass
+from typing import Optional
+
+try:
+    from re import _parser as sre_parse  # Python 3.11+
+except ImportError:  # pragma: no cover
+    import sre_parse
+
+
+# Literals shorter than this trigger on almost every line, so rules whose
+# best required literal is this short are scanned directly instead.
+MIN_TRIGGER_LENGTH = 3
+
+
+@dataclass(frozen=True)
+class ScanRule:
+    """A single heuristic rule compiled into the scanner."""
+    pattern: str
+    description: str
+    category: str
+    first_only: bool = False  # Stop after the first match (presence checks)
+
+
+@dataclass(frozen=True)
+class ScanMatch:
+    """A rule match found by the scanner."""
+    rule: ScanRule
+    start: int
+    end: int
+    text: str
+
+
+def _required_literals(items) -> Optional[frozenset[str]]:
+    """
+    Find a set of literals of which at least one occurs in every match.
+
+    Walks the parsed regex sequence, collecting runs of literal characters
+    and branches whose every alternative has its own required literal.
+    Returns the candidate with the longest shortest-literal, or None.
+    """
+    best = None
+    run: list[str] = []
+
+    def consider(candidate: Optional[frozenset[str]]):
+        nonlocal best
+        if not candidate:
+            return
+        if best is None or min(map(len, candidate)) > min(map(len, best)):
+            best = candidate
+
+    for op, av in items:
+        if op is sre_parse.LITERAL:
+            run.append(chr(av).lower())
+            continue
+        if run:
+            consider(frozenset(["".join(run)]))
+            run = []
+        if op is sre_parse.SUBPATTERN:
+            consider(_required_literals(av[-1]))
+        elif op is sre_parse.BRANCH:
+            alternatives = [_required_literals(branch) for branch in av[1]]
+            if all(alternatives):
+                consider(frozenset().union(*alternatives))
+    if run:
+        consider(frozenset(["".join(run)]))
+
+    return best
+
+
+class PatternScanner:
+    """
+    Scans text for many case-insensitive rules in a single pass.
+
+    Every rule's pattern is reduced to the literals it requires; all those
+    literals are combined into one alternation that walks the text once.
+    Only lines containing a trigger literal are handed to the precompiled
+    regexes of the rules that literal belongs to. Rules without a usable
+    literal fall back to a direct scan of the text.
+
+    Triggered rules match within a single line, which is how diff content
+    is laid out anyway.
+    """
+
+    def __init__(self, rules: list[ScanRule]):
+        self.rules = rules
+        # Changes whenever a rule does, so results cached per rule set go stale
+        self.version = hashlib.sha256(repr([
+            (rule.pattern, rule.category, rule.first_only) for rule in rules
+        ]).encode()).hexdigest()[:16]
+        self._compiled = [re.compile(rule.pattern, re.IGNORECASE) for rule in rules]
+        self._untriggered: list[int] = []
+
+        triggers: dict[str, set[int]] = {}
+        for idx, rule in enumerate(rules):
+            literals = _required_literals(sre_parse.parse(rule.pattern, re.IGNORECASE))
+            if not literals or min(map(len, literals)) < MIN_TRIGGER_LENGTH:
+                self._untriggered.append(idx)
+                continue
+            for literal in literals:
+                triggers.setdefault(literal, set()).add(idx)
+
+        # The alternation prefers the longest literal at a position, so a
+        # match must also dispatch to rules owning any shorter prefix of it.
+        self._dispatch = {
+            literal: sorted({
+                idx
+                for other, owners in triggers.items()
+                if literal.startswith(other)
+                for idx in owners
+            })
+            for literal in triggers
+        }
+
+        self._trigger_re = None
+        if triggers:
+            self._trigger_re = re.compile("|".join(
+                re.escape(literal) for literal in sorted(triggers, key=len, reverse=True)
+            ))
+
+    def scan(self, text: str) -> list[ScanMatch]:
+        """Return all matches, ordered by rule and then by position."""
+        return [match for matches in self._scan_per_rule(text) for match in matches]
+
+    def scan_compact(self, text: str, offset: int = 0) -> list[tuple[int, int, int, str]]:
+        """
+        Like scan(), but as `(rule index, start, end, text)` tuples shifted by
+        `offset`. Cheap to pickle, for shards scanned in worker processes.
+        """
+        return [
+            (idx, match.start + offset, match.end + offset, match.text)
+            for idx, matches in enumerate(self._scan_per_rule(text))
+            for match in matches
+        ]
+
+    def merge(self, shard_results: list[list[tuple[int, int, int, str]]]) -> list[ScanMatch]:
+        """
+        Combine scan_compact() results for consecutive shards of a text.
+
+        Shards must be given in text order; the result is ordered exactly as
+        if scan() had been run over the whole text.
+        """
+        per_rule: list[list[ScanMatch]] = [[] for _ in self.rules]
+        for results in shard_results:
+            for idx, start, end, matched in results:
+                rule = self.rules[idx]
+                if rule.first_only and per_rule[idx]:
+                    continue
+                per_rule[idx].append(ScanMatch(rule=rule, start=start, end=end, text=matched))
+        return [match for matches in per_rule for match in matches]
+
+    def _scan_per_rule(self, text: str) -> list[list[ScanMatch]]:
+        per_rule: list[list[ScanMatch]] = [[] for _ in self.rules]
+
+        for idx in self._untriggered:
+            self._collect(idx, text, 0, len(text), per_rule[idx])
+
+        if self._trigger_re is not None:
+            self._scan_triggered(text, per_rule)
+
+        return per_rule
+
+    def _scan_triggered(self, text: str, per_rule: list[list[ScanMatch]]):
+        """Walk the text once, dispatching trigger hits to their rules."""
+        lowered = text.lower()
+        if len(lowered) != len(text):
+            # U+0130 is the only character that grows when lowercased; fold it
+            # first so offsets into the lowered copy line up with the text.
+            lowered = text.replace("\u0130", "i").lower()
+        search = self._trigger_re.search
+
+        line_start = line_end = -1
+        seen: set[int] = set()
+        pos = 0
+        while True:
+            hit = search(lowered, pos)
+            if hit is None:
+                break
+            start = hit.start()
+            if start >= line_end:
+                line_start = text.rfind("\n", 0, start) + 1
+                line_end = text.find("\n", start)
+                if line_end == -1:
+                    line_end = len(text)
+                seen = set()
+
+            for idx in self._dispatch[hit.group(0)]:
+                if idx in seen:
+                    continue
+                seen.add(idx)
+                if self.rules[idx].first_only and per_rule[idx]:
+                    continue
+                self._collect(idx, text, line_start, line_end, per_rule[idx])
+
+            # Restart one character later so overlapping literals still fire
+            pos = start + 1
+
+    def _collect(self, idx: int, text: str, start: int, end: int, out: list[ScanMatch]):
+        """Run one rule's regex over text[start:end]."""
+        rule = self.rules[idx]
+        for match in self._compiled[idx].finditer(text, start, end):
+            out.append(ScanMatch(rule=rule, start=match.start(), end=match.end(), text=match.group(0)))
+            if rule.first_only:
+                break
@@ -0,0 +1,522 @@
+"""
+Analysis worker.
+
+Claims jobs from the durable queue in the database and runs them. Start
+standalone workers with:
+
+    python -m app.worker
+
+or let the API process run one in-process (EMBEDDED_WORKER=true, the
+default) for single-process deployments.
+"""
+import asyncio
+import os
+import signal
+import socket
+import time
+import uuid
+from contextlib import asynccontextmanager
+from datetime import datetime
+from typing import Optional
+
+import httpx
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import contains_eager
+
+from .config import get_settings
+from .models import engine, init_db, AnalysisRun, AnalysisResult
+from .models.analysis import AnalysisStatus
+from .models.database import SessionLocal
+from .models.job import AnalysisJob
+from .schemas.analysis import AnalyzeRequest, Finding, StructuredReview
+from .services.analyzer import AnalyzerService
+from .services.blob_store import get_blob_store, load_diff_text, load_result_json
+from .services.coalescing import analysis_key, options_hash, result_cache_key
+from .services.events import get_event_broker
+from .services.executors import run_cpu_bound, run_db_write, shutdown_executors
+from .services.findings_cache import get_findings_cache
+from .services.github import GitHubService, PRData, create_github_client
+from .services.http_cache import ResponseCache, create_response_cache
+from .services.job_queue import JobQueue, get_job_queue
+from .services.llm import LLMClient, create_llm_client
+from .services.rate_limit import GitHubRateLimiter
+from .services.result_cache import get_result_cache
+
+
+# The compare API lists at most this many files
+COMPARE_FILE_LIMIT = 300
+
+
+def _previous_run(db, run: AnalysisRun, model_version: str) -> Optional[AnalysisRun]:
+    """The latest completed run of the same PR with the same options and model."""
+    return (
+        db.query(AnalysisRun)
+        .join(AnalysisResult)
+        .options(contains_eager(AnalysisRun.result))  # Its review is merged in, so load it now
+        .filter(
+            AnalysisRun.repo == run.repo,
+            AnalysisRun.pr_number == run.pr_number,
+            AnalysisRun.options_hash == run.options_hash,
+            AnalysisRun.status == AnalysisStatus.COMPLETED,
+            AnalysisRun.head_sha.is_not(None),
+            AnalysisRun.id != run.id,
+            AnalysisResult.model_version == model_version,
+        )
+        .order_by(AnalysisRun.completed_at.desc())
+        .first()
+    )
+
+
+async def _changed_since(github_service: GitHubService, pr_data: PRData, base_sha: str) -> Optional[set[str]]:
+    """Paths changed from `base_sha` to the PR head, or None if a full review is needed."""
+    if base_sha == pr_data.head_sha:
+        return set()
+    try:
+        comparison = await github_service.compare_commits(pr_data.owner, pr_data.repo, base_sha, pr_data.head_sha)
+    except httpx.HTTPError:
+        return None
+    # After a force-push or rebase the old head is no longer an ancestor
+    if comparison.get("status") != "ahead":
+        return None
+    files = comparison.get("files", [])
+    if len(files) >= COMPARE_FILE_LIMIT:
+        return None
+    changed = set()
+    for f in files:
+        changed.add(f["filename"])
+        if f.get("previous_filename"):
+            changed.add(f["previous_filename"])
+    return changed
+
+
+async def _publish_status(run_id: int, status: AnalysisStatus, error_message: Optional[str] = None):
+    await get_event_broker().publish(run_id, "status", {
+        "status": AnalysisStatus(status).value,
+        "error_message": error_message,
+    })
+
+
+# Run status writes, applied in order by the database writer (see run_db_write)
+
+def _start_run(db, run_id: int, options_hash: str) -> bool:
+    """Mark the run processing; False if it is gone or already completed."""
+    run = db.get(AnalysisRun, run_id)
+    if not run or run.status == AnalysisStatus.COMPLETED:
+        return False
+    run.status = AnalysisStatus.PROCESSING
+    run.options_hash = options_hash
+    run.partial_findings = None
+    return True
+
+
+# A job whose lease expired can briefly run twice; whichever copy finishes
+# first completes the run and the other's writes are dropped
+
+def _complete_from_cache(db, run_id: int, head_sha: Optional[str], cached: AnalysisResult) -> bool:
+    run = db.get(AnalysisRun, run_id)
+    if run.status == AnalysisStatus.COMPLETED:
+        return False
+    if head_sha:
+        run.head_sha = head_sha
+    get_result_cache().complete_from(db, run, cached)
+    return True
+
+
+def _save_result(db, run_id: int, head_sha: Optional[str], result_json: dict, model_version: str, cache_key: Optional[str]) -> bool:
+    run = db.get(AnalysisRun, run_id)
+    if run.status == AnalysisStatus.COMPLETED:
+        return False
+    try:
+        result_blob = get_blob_store().put_json(db, result_json)
+    except IntegrityError:
+        # Stored meanwhile by an identical review; nothing else written yet
+        db.rollback()
+        result_blob = get_blob_store().put_json(db, result_json)
+    db.add(AnalysisResult(
+        run_id=run_id,
+        result_blob=result_blob,
+        model_version=model_version,
+        cache_key=cache_key,
+    ))
+    if head_sha:
+        run.head_sha = head_sha
+    run.status = AnalysisStatus.COMPLETED
+    run.completed_at = datetime.utcnow()
+    run.inflight_key = None
+    run.partial_findings = None
+    return True
+
+
+def _record_failure(db, run_id: int, error: str, final_attempt: bool) -> Optional[AnalysisStatus]:
+    """Fail the run, or return it to pending if it will be retried; returns the new status."""
+    run = db.get(AnalysisRun, run_id)
+    if not run or run.status == AnalysisStatus.COMPLETED:
+        return None
+    run.error_message = error
+    if final_attempt:
+        run.status = AnalysisStatus.FAILED
+        run.completed_at = datetime.utcnow()
+        run.inflight_key = None
+    else:
+        # Will be retried; report it as waiting again
+        run.status = AnalysisStatus.PENDING
+    return run.status
+
+
+@asynccontextmanager
+async def _stage(run_id: int, name: str):
+    """Publish how long the enclosed stage of an analysis took."""
+    started = time.perf_counter()
+    yield
+    await get_event_broker().publish(run_id, "stage", {
+        "stage": name,
+        "seconds": round(time.perf_counter() - started, 3),
+    })
+
+
+class PartialFindings:
+    """
+    Publishes findings streamed from the LLM as they arrive and saves them
+    on the run, at most every `interval` seconds. Findings arriving sooner
+    are saved by a deferred flush, so they show up even if no more follow.
+    A finding repeated by another chunk is only published once.
+    """
+
+    def __init__(self, run_id: int, interval: float):
+        self.run_id = run_id
+        self.interval = interval
+        self.findings: list[dict] = []
+        self._seen: set[tuple] = set()
+        self._saved_at = 0.0
+        self._pending: Optional[asyncio.Task] = None
+
+    async def add(self, finding: Finding):
+        # Same identity as the merged review uses: rule, file and line
+        key = (finding.title, finding.file, finding.line_number)
+        if key in self._seen:
+            return
+        self._seen.add(key)
+        self.findings.append(finding.model_dump(mode="json"))
+        await get_event_broker().publish(self.run_id, "finding", self.findings[-1])
+        wait = self._saved_at + self.interval - time.monotonic()
+        if wait <= 0:
+            await self._flush()
+        elif self._pending is None:
+            self._pending = asyncio.create_task(self._flush_later(wait))
+
+    async def _flush_later(self, delay: float):
+        await asyncio.sleep(delay)
+        self._pending = None
+        await self._flush()
+
+    async def _flush(self):
+        self._saved_at = time.monotonic()
+        await run_db_write(self._save, list(self.findings))
+
+    def cancel(self):
+        """Drop a pending flush once the analysis is over."""
+        if self._pending is not None:
+            self._pending.cancel()
+            self._pending = None
+
+    async def reset(self):
+        """Drop the findings so far, e.g. when the LLM failed and heuristics take over."""
+        self.cancel()
+        self.findings = []
+        self._seen.clear()
+        await self._flush()
+        await get_event_broker().publish(self.run_id, "findings_reset", {})
+
+    def _save(self, db, findings: list[dict]):
+        db.query(AnalysisRun).filter(
+            AnalysisRun.id == self.run_id,
+            AnalysisRun.status == AnalysisStatus.PROCESSING,
+        ).update({"partial_findings": findings})
+
+
+async def run_analysis(
+    run_id: int,
+    request: AnalyzeRequest,
+    github_service: GitHubService,
+    llm: Optional[LLMClient] = None,
+    final_attempt: bool = True,
+):
+    """Run the analysis for a run and store its result."""
+    # Writes go through the database writer. Reads use short sessions, so no
+    # connection is held while waiting on GitHub or the LLM
+    try:
+        if not await run_db_write(_start_run, run_id, options_hash(request.options)):
+            return
+        await _publish_status(run_id, AnalysisStatus.PROCESSING)
+        with SessionLocal() as db:
+            run = db.get(AnalysisRun, run_id)
+
+        analyzer = AnalyzerService(llm=llm)
+        cache = get_result_cache()
+        head_sha = None
+        base_run = None  # Previous run an incremental review builds on
+
+        # Get analysis payload
+        if request.pr_url:
+            async with _stage(run_id, "fetch"):
+                pr_data = await github_service.fetch_pr_data(request.pr_url)
+            head_sha = pr_data.head_sha
+            key = analysis_key(
+                request.options,
+                repo=f"{pr_data.owner}/{pr_data.repo}",
+                pr_number=pr_data.pr_number,
+                head_sha=pr_data.head_sha,
+            )
+            async with _stage(run_id, "normalize"):
+                payload = await run_cpu_bound(
+                    analyzer.normalize_payload,
+                    pr_data,
+                    language_hint=request.options.language_hint,
+                    rules_yaml=request.options.rules_yaml,
+                )
+
+            # Try to fetch repo rules if requested
+            if request.options.use_repo_rules and not request.options.rules_yaml:
+                async with _stage(run_id, "rules"):
+                    rules = await github_service.get_repo_file(
+                        pr_data.owner, pr_data.repo, "review_rules.yml"
+                    ) or await github_service.get_repo_file(
+                        pr_data.owner, pr_data.repo, ".review_rules.yml"
+                    )
+                if rules:
+                    payload.rules_yaml = rules
+
+            # Only re-review files changed since the last analyzed head
+            if request.options.incremental:
+                with SessionLocal() as db:
+                    previous = _previous_run(db, run, analyzer.model_version)
+                if previous:
+                    async with _stage(run_id, "compare"):
+                        changed = await _changed_since(github_service, pr_data, previous.head_sha)
+                    if changed is not None:
+                        payload = await run_cpu_bound(analyzer.restrict_to_files, payload, changed)
+                        base_run = previous
+        else:
+            # Jobs queued before the blob store carry the diff in their payload
+            diff_text = request.diff_text
+            if not diff_text:
+                with SessionLocal() as db:
+                    diff_text = load_diff_text(db, run)
+            key = analysis_key(request.options, diff_text=diff_text)
+            async with _stage(run_id, "normalize"):
+                payload = await run_cpu_bound(
+                    analyzer.normalize_diff_payload,
+                    diff_text,
+                    language_hint=request.options.language_hint,
+                    rules_yaml=request.options.rules_yaml,
+                )
+
+        # The head may have been unknown at submit time; check again
+        key = result_cache_key(key, analyzer.model_version, analyzer.SCANNER.version)
+        cached = None
+        if cache:
+            with SessionLocal() as db:
+                cached = cache.lookup(db, key)
+        if cached:
+            if await run_db_write(_complete_from_cache, run_id, head_sha, cached):
+                await _publish_status(run_id, AnalysisStatus.COMPLETED)
+            return
+
+        # Run analysis, publishing findings as they stream in
+        partial = PartialFindings(run_id, analyzer.settings.llm_partial_flush_seconds)
+        try:
+            async with _stage(run_id, "analyze"):
+                if base_run is None:
+                    review = await analyzer.analyze(payload, on_finding=partial.add, on_discard=partial.reset)
+                else:
+                    with SessionLocal() as db:
+                        previous_review = StructuredReview(**load_result_json(db, base_run.result)["review"])
+                    if payload.diff_files:
+                        review = await analyzer.analyze(payload, on_finding=partial.add, on_discard=partial.reset)
+                        review = analyzer.merge_incremental(previous_review, review, changed, payload.file_names)
+                    else:
+                        review = previous_review
+        finally:
+            partial.cancel()
+        async with _stage(run_id, "format"):
+            markdown = await run_cpu_bound(analyzer.format_as_markdown, review)
+
+        # Save result
+        result_json = {
+            "review": review.model_dump(),
+            "markdown": markdown,
+        }
+        if base_run is not None:
+            result_json["incremental_from"] = base_run.id
+        if await run_db_write(
+            _save_result, run_id, head_sha, result_json, analyzer.model_version, key if cache else None
+        ):
+            await _publish_status(run_id, AnalysisStatus.COMPLETED)
+
+    except Exception as e:
+        status = await run_db_write(_record_failure, run_id, str(e), final_attempt)
+        if status is not None:
+            await _publish_status(run_id, status, str(e))
+        raise
+
+
+class Worker:
+    """Runs up to `concurrency` queued analyses at a time."""
+
+    def __init__(
+        self,
+        client: httpx.AsyncClient,
+        cache: Optional[ResponseCache],
+        rate_limiter: GitHubRateLimiter,
+        llm: Optional[LLMClient] = None,
+        queue: Optional[JobQueue] = None,
+        concurrency: Optional[int] = None,
+        poll_interval: Optional[float] = None,
+    ):
+        settings = get_settings()
+        self.client = client
+        self.cache = cache
+        self.rate_limiter = rate_limiter
+        self.llm = llm
+        self.queue = queue or get_job_queue()
+        self.concurrency = concurrency or settings.worker_concurrency
+        self.poll_interval = poll_interval or settings.worker_poll_interval
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._stopping = asyncio.Event()
+        self._tasks: list[asyncio.Task] = []
+
+    def start(self):
+        """Start the claim loops and the lease reaper on the running loop."""
+        self._tasks = [
+            asyncio.create_task(self._claim_loop(slot)) for slot in range(self.concurrency)
+        ]
+        self._tasks.append(asyncio.create_task(self._reap_loop()))
+
+    async def stop(self, timeout: float = 10.0):
+        """Stop claiming; in-flight jobs get `timeout` seconds before being released."""
+        self._stopping.set()
+        _, pending = await asyncio.wait(self._tasks, timeout=timeout)
+        for task in pending:
+            task.cancel()
+        await asyncio.gather(*pending, return_exceptions=True)
+
+    async def _sleep(self, seconds: float):
+        try:
+            await asyncio.wait_for(self._stopping.wait(), timeout=seconds)
+        except asyncio.TimeoutError:
+            pass
+
+    async def _claim_loop(self, slot: int):
+        while not self._stopping.is_set():
+            try:
+                job = await run_db_write(self._claim)
+            except Exception as e:
+                print(f"Worker {self.worker_id}[{slot}] failed to claim a job: {e}")
+                job = None
+            if job is None:
+                await self._sleep(self.poll_interval)
+                continue
+            await self._process(job)
+
+    def _claim(self, db) -> Optional[AnalysisJob]:
+        job = self.queue.claim(db, self.worker_id)
+        if job is not None:
+            db.refresh(job)
+            db.expunge(job)
+        return job
+
+    async def _process(self, job: AnalysisJob):
+        github_service = GitHubService(client=self.client, cache=self.cache, rate_limiter=self.rate_limiter)
+        final_attempt = job.attempts >= self.queue.max_attempts
+        error = None
+        try:
+            request = AnalyzeRequest(**job.payload)
+        except ValueError as e:
+            print(f"Analysis job {job.id} (run {job.run_id}) has an invalid payload: {e}")
+            await run_db_write(self._finish, job, str(e), False)
+            return
+        analysis = asyncio.create_task(
+            run_analysis(job.run_id, request, github_service, llm=self.llm, final_attempt=final_attempt)
+        )
+        heartbeat = asyncio.create_task(self._heartbeat(job, analysis))
+        try:
+            await analysis
+        except asyncio.CancelledError:
+            if heartbeat.done() and not heartbeat.cancelled():
+                return  # Lease lost: the job is another worker's now
+            await run_db_write(self._finish, job, None, True)
+            raise
+        except Exception as e:
+            error = str(e) or e.__class__.__name__
+            print(f"Analysis job {job.id} (run {job.run_id}) failed: {error}")
+        finally:
+            heartbeat.cancel()
+        await run_db_write(self._finish, job, error, False)
+
+    async def _heartbeat(self, job: AnalysisJob, analysis: asyncio.Task):
+        """Renew the job's lease while it runs; abandon the analysis if the lease is lost."""
+        while True:
+            await asyncio.sleep(self.queue.lease_seconds / 3)
+            try:
+                held = await run_db_write(self.queue.heartbeat, job)
+            except Exception as e:
+                print(f"Worker {self.worker_id} failed to renew the lease on job {job.id}: {e}")
+                continue
+            if not held:
+                print(f"Worker {self.worker_id} lost the lease on job {job.id}; abandoning run {job.run_id}")
+                analysis.cancel()
+                return
+
+    def _finish(self, db, job: AnalysisJob, error: Optional[str], released: bool):
+        if released:
+            self.queue.release(db, job)
+        elif error is not None:
+            self.queue.fail(db, job, error)
+        else:
+            self.queue.complete(db, job)
+
+    async def _reap_loop(self):
+        """Periodically requeue jobs whose worker died mid-analysis."""
+        interval = max(self.poll_interval, min(60.0, self.queue.lease_seconds / 4))
+        while not self._stopping.is_set():
+            try:
+                await run_db_write(self._reap)
+            except Exception as e:
+                print(f"Worker {self.worker_id} failed to requeue expired jobs: {e}")
+            await self._sleep(interval)
+
+    def _reap(self, db):
+        self.queue.requeue_expired(db)
+        for cache in (get_result_cache(), get_findings_cache()):
+            if cache:
+                cache.evict(db)
+
+
+async def main():
+    """Entry point for a standalone worker process."""
+    init_db(engine)
+    client = create_github_client()
+    cache = create_response_cache()
+    llm = create_llm_client()
+    worker = Worker(client=client, cache=cache, rate_limiter=GitHubRateLimiter.from_settings(), llm=llm)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    worker.start()
+    print(f"Worker {worker.worker_id} started with concurrency {worker.concurrency}")
+    await stop.wait()
+
+    await worker.stop()
+    await client.aclose()
+    if llm is not None:
+        await llm.aclose()
+    if cache is not None:
+        cache.close()
+    shutdown_executors()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,45 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+# Settings are read when app modules are imported: point them at a throwaway
+# database and keep the tests off the network before anything imports `app`
+_db_dir = tempfile.mkdtemp(prefix="pr-reviewer-tests-")
+os.environ["DATABASE_URL"] = f"sqlite:///{_db_dir}/test.db"
+os.environ["OPENAI_API_KEY"] = ""
+os.environ["GITHUB_TOKEN"] = ""
+os.environ["EMBEDDED_WORKER"] = "false"
+os.environ["BLOB_STORE_PATH"] = os.path.join(_db_dir, "blobs")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.models import AnalysisRun, Base, engine  # noqa: E402
+from app.models.analysis import AnalysisStatus  # noqa: E402
+from app.models.database import SessionLocal  # noqa: E402
+
+
+@pytest.fixture
+def db():
+    """A session on freshly created tables."""
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    session = SessionLocal()
+    try:
+        yield session
+    finally:
+        session.close()
+
+
+@pytest.fixture
+def enqueue(db):
+    """Queue a job for a new pending run: `enqueue(queue)`, returns the job."""
+    def enqueue(queue):
+        run = AnalysisRun(status=AnalysisStatus.PENDING)
+        db.add(run)
+        db.flush()
+        job = queue.enqueue(db, run.id, {"diff_text": "x"})
+        db.commit()
+        return job
+    return enqueue
@@ -0,0 +1,70 @@
+import json
+from types import SimpleNamespace
+
+import pytest
+
+from app.services.analyzer import AnalyzerService
+from app.services.prompt_budget import get_token_counter
+
+REVIEW = {
+    "pr_summary": {"what_changed": "w", "why_it_changed": "w", "key_files": []},
+    "findings": [],
+    "risk_matrix": {"security": "low", "performance": "low", "breaking_change": "low", "maintainability": "low"},
+    "test_plan": {"unit_tests": [], "integration_tests": [], "edge_cases": []},
+    "merge_readiness": {"score": 90, "blockers": [], "notes": ""},
+}
+
+
+class RecordingLLM:
+    """Stands in for LLMClient, keeping every prompt it is sent."""
+
+    def __init__(self):
+        self.prompts: list[str] = []
+
+    async def chat(self, *, messages, **kwargs):
+        self.prompts.append(messages[-1]["content"])
+        return SimpleNamespace(choices=[SimpleNamespace(message=SimpleNamespace(content=json.dumps(REVIEW)))])
+
+
+@pytest.mark.asyncio
+async def test_chunks_fit_the_prompt_budget():
+    diff = "".join(
+        f"diff --git a/src/module{i}.py b/src/module{i}.py\n--- a/src/module{i}.py\n+++ b/src/module{i}.py\n"
+        f"@@ -0,0 +1,60 @@\n" + "".join(f"+value_{i}_{n} = compute({n}, 'some argument')\n" for n in range(60))
+        for i in range(40)
+    )
+    analyzer = AnalyzerService()
+    payload = analyzer.normalize_diff_payload(diff, rules_yaml="rules:\n" + "  - never do anything risky\n" * 400)
+    payload.body = "A long description of the change. " * 500
+    llm = RecordingLLM()
+
+    await analyzer._review_diff(llm, payload)
+
+    counter = get_token_counter(analyzer.settings.llm_model)
+    assert len(llm.prompts) > 1
+    assert all(counter.count(prompt) <= analyzer.settings.llm_prompt_tokens for prompt in llm.prompts)
+    assert not any("[Diff truncated" in prompt for prompt in llm.prompts)
+    sent = "".join(llm.prompts)
+    missing = [line.content for f in payload.diff_files for line in f.added_lines() if line.content not in sent]
+    assert missing == []
+
+
+@pytest.mark.asyncio
+async def test_llm_failure_discards_streamed_findings(monkeypatch):
+    analyzer = AnalyzerService()
+    analyzer.settings = analyzer.settings.model_copy(update={"openai_api_key": "test"})
+    events = []
+
+    async def failing_llm(payload, on_finding):
+        events.append("finding")
+        raise RuntimeError("stream dropped")
+
+    async def on_discard():
+        events.append("discard")
+
+    monkeypatch.setattr(analyzer, "_analyze_with_llm", failing_llm)
+    payload = analyzer.normalize_diff_payload("diff --git a/a.py b/a.py\n--- a/a.py\n+++ b/a.py\n@@ -0,0 +1 @@\n+eval(x)\n")
+    review = await analyzer.analyze(payload, on_finding=None, on_discard=on_discard)
+
+    assert events == ["finding", "discard"]
+    assert review.findings  # From the heuristics
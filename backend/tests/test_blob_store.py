@@ -0,0 +1,49 @@
+import pytest
+from sqlalchemy import event
+from sqlalchemy.exc import IntegrityError
+
+from app.models import Blob
+from app.models.database import SessionLocal
+from app.services.blob_store import DatabaseBlobStore, FileBlobStore, prepare_blob
+
+
+def test_database_round_trip_and_dedupe(db):
+    store = DatabaseBlobStore()
+    key = store.put_text(db, "diff --git a/x b/x\n" * 100)
+    assert store.put_text(db, "diff --git a/x b/x\n" * 100) == key
+    db.commit()
+    assert store.get_text(db, key) == "diff --git a/x b/x\n" * 100
+    assert db.query(Blob).count() == 1
+
+
+def test_file_round_trip(tmp_path):
+    store = FileBlobStore(str(tmp_path))
+    key = store.put_json(None, {"b": 1, "a": [2]})
+    assert store.put_json(None, {"a": [2], "b": 1}) == key
+    assert store.get_json(None, key) == {"a": [2], "b": 1}
+
+
+def test_blob_rolls_back_with_caller(db):
+    store = DatabaseBlobStore()
+    key = store.put_text(db, "never committed")
+    db.rollback()
+    with pytest.raises(KeyError):
+        store.get(db, key)
+
+
+def test_concurrent_identical_blob(db):
+    store = DatabaseBlobStore()
+    blob = prepare_blob(b"uploaded twice")
+
+    # Another transaction commits the same blob between the existence check and the insert
+    @event.listens_for(db, "before_flush", once=True)
+    def store_concurrently(session, context, instances):
+        with SessionLocal() as other:
+            store.put_prepared(other, blob)
+            other.commit()
+
+    with pytest.raises(IntegrityError):
+        store.put_prepared(db, blob)
+    db.rollback()
+    assert store.put_prepared(db, blob) == blob.key
+    assert db.query(Blob).count() == 1
@@ -0,0 +1,14 @@
+from app.schemas.analysis import AnalyzeOptions
+from app.services.coalescing import analysis_key, result_cache_key
+
+
+def test_same_diff_same_key():
+    options = AnalyzeOptions()
+    assert analysis_key(options, diff_text="a") == analysis_key(options, diff_text="a")
+    assert analysis_key(options, diff_text="a") != analysis_key(options, diff_text="b")
+
+
+def test_result_key_changes_with_rules():
+    key = analysis_key(AnalyzeOptions(), repo="o/r", pr_number=1, head_sha="abc")
+    assert result_cache_key(key, "gpt", "rules1") != result_cache_key(key, "gpt", "rules2")
+    assert result_cache_key(None, "gpt", "rules1") is None
@@ -0,0 +1,141 @@
+from app.services.diff_parser import ADDED, CONTEXT, REMOVED, parse_diff, split_diff
+
+
+GIT_DIFF = """\
+diff --git a/app.py b/app.py
+index 1111111..2222222 100644
+--- a/app.py
++++ b/app.py
+@@ -1,3 +1,4 @@ def main():
+ import os
+-x = 1
++x = 2
++y = 3
+ print(x)
+diff --git a/new.py b/new.py
+new file mode 100644
+index 0000000..3333333
+--- /dev/null
++++ b/new.py
+@@ -0,0 +1,2 @@
++a = 1
++b = 2
+"""
+
+
+def test_git_diff():
+    files = list(parse_diff(GIT_DIFF))
+    assert [f.path for f in files] == ["app.py", "new.py"]
+
+    app = files[0]
+    assert (app.old_blob, app.new_blob) == ("1111111", "2222222")
+    hunk = app.hunks[0]
+    assert (hunk.old_start, hunk.old_count, hunk.new_start, hunk.new_count) == (1, 3, 1, 4)
+    assert hunk.section == "def main():"
+    assert [line.kind for line in hunk.lines] == [CONTEXT, REMOVED, ADDED, ADDED, CONTEXT]
+    assert [(line.content, line.new_lineno) for line in app.added_lines()] == [("x = 2", 2), ("y = 3", 3)]
+    assert hunk.lines[1].old_lineno == 2
+    assert hunk.lines[4].old_lineno == 3 and hunk.lines[4].new_lineno == 4
+
+    new = files[1]
+    assert new.old_path is None and new.new_path == "new.py"
+    assert [line.new_lineno for line in new.added_lines()] == [1, 2]
+
+
+def test_plain_unified_diff():
+    diff = """\
+--- a.txt\t2024-01-01 00:00:00
++++ a.txt\t2024-01-02 00:00:00
+@@ -1 +1 @@
+-old
++new
+--- b.txt
++++ b.txt
+@@ -1,2 +1,2 @@
+ keep
+-gone
++here
+"""
+    files = list(parse_diff(diff))
+    assert [f.path for f in files] == ["a.txt", "b.txt"]
+    assert [line.content for line in files[0].added_lines()] == ["new"]
+    assert [(line.content, line.new_lineno) for line in files[1].added_lines()] == [("here", 2)]
+
+
+def test_rename():
+    diff = """\
+diff --git a/old name.py b/new name.py
+similarity index 90%
+rename from old name.py
+rename to new name.py
+index 4444444..5555555 100644
+--- a/old name.py
++++ b/new name.py
+@@ -1 +1 @@
+-a
++b
+"""
+    (f,) = parse_diff(diff)
+    assert f.old_path == "old name.py"
+    assert f.new_path == "new name.py"
+    assert [line.content for line in f.added_lines()] == ["b"]
+
+
+def test_binary():
+    diff = """\
+diff --git a/logo.png b/logo.png
+index 6666666..7777777 100644
+Binary files a/logo.png and b/logo.png differ
+diff --git a/x.py b/x.py
+--- a/x.py
++++ b/x.py
+@@ -1 +1 @@
+-1
++2
+"""
+    files = list(parse_diff(diff))
+    assert files[0].path == "logo.png" and files[0].is_binary and not files[0].hunks
+    assert not files[1].is_binary
+
+
+def test_no_newline_at_end_of_file():
+    diff = """\
+diff --git a/a.py b/a.py
+--- a/a.py
++++ b/a.py
+@@ -1 +1 @@
+-old
+\\ No newline at end of file
++new
+\\ No newline at end of file
+diff --git a/b.py b/b.py
+--- a/b.py
++++ b/b.py
+@@ -1 +1,2 @@
+ x
++y
+"""
+    files = list(parse_diff(diff))
+    assert [f.path for f in files] == ["a.py", "b.py"]
+    assert [line.kind for line in files[0].hunks[0].lines] == [REMOVED, ADDED]
+    assert [line.content for line in files[1].added_lines()] == ["y"]
+
+
+def test_accepts_iterable_of_lines():
+    assert [f.path for f in parse_diff(GIT_DIFF.splitlines(keepends=True))] == ["app.py", "new.py"]
+
+
+
+def test_split_diff_keeps_every_line_parseable():
+    diff = "".join(
+        f"diff --git a/f{i}.py b/f{i}.py\n--- a/f{i}.py\n+++ b/f{i}.py\n@@ -1,10 +1,40 @@ def f{i}():\n"
+        + "".join(f" same {n}\n+line {i}.{n}\n+more {i}.{n}\n" for n in range(10))
+        + "".join(f"+line {i}.{n}\n" for n in range(10, 20))
+        for i in range(5)
+    )
+    whole = [(f.path, line.new_lineno, line.content) for f in parse_diff(diff) for line in f.added_lines()]
+    chunks = split_diff(diff, 300)
+    assert len(chunks) > 5  # Every file is over budget on its own
+    assert all(len(chunk) <= 300 for chunk in chunks)
+    pieces = [(f.path, line.new_lineno, line.content) for chunk in chunks for f in parse_diff(chunk) for line in f.added_lines()]
+    assert pieces == whole
@@ -0,0 +1,86 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from app.services.github import GitHubService
+from app.services.rate_limit import GitHubRateLimiter
+
+
+def service(handler, rate_limiter=None) -> GitHubService:
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+    return GitHubService(client=client, rate_limiter=rate_limiter or GitHubRateLimiter(backoff=0.01))
+
+
+@pytest.mark.asyncio
+async def test_head_sha():
+    async def handler(request):
+        assert request.url.path == "/repos/o/r/pulls/7"
+        return httpx.Response(200, json={"head": {"sha": "abc"}})
+
+    assert await service(handler).get_pr_head_sha("o", "r", 7, timeout=1) == "abc"
+
+
+@pytest.mark.asyncio
+async def test_head_sha_does_not_retry():
+    calls = 0
+
+    async def handler(request):
+        nonlocal calls
+        calls += 1
+        return httpx.Response(502)
+
+    assert await service(handler).get_pr_head_sha("o", "r", 7, timeout=1) is None
+    assert calls == 1
+
+
+@pytest.mark.asyncio
+async def test_head_sha_times_out():
+    async def handler(request):
+        await asyncio.sleep(5)
+        return httpx.Response(200, json={"head": {"sha": "abc"}})
+
+    started = time.monotonic()
+    assert await service(handler).get_pr_head_sha("o", "r", 7, timeout=0.1) is None
+    assert time.monotonic() - started < 1
+
+
+@pytest.mark.asyncio
+async def test_head_sha_does_not_wait_for_rate_limit():
+    async def handler(request):
+        raise AssertionError("sent while throttled")
+
+    limiter = GitHubRateLimiter(reserve=50)
+    budget = limiter.budget("anon")
+    budget.remaining = 10
+    budget.reset_at = time.time() + 3600
+    assert await service(handler, limiter).get_pr_head_sha("o", "r", 7, timeout=1) is None
+
+
+@pytest.mark.asyncio
+async def test_fetch_pr_data_reads_every_page():
+    def page(request, items):
+        number = int(request.url.params.get("page", 1))
+        per_page = int(request.url.params["per_page"])
+        last = (len(items) + per_page - 1) // per_page
+        headers = {"Link": f'<{request.url.copy_set_param("page", last)}>; rel="last"'}
+        return httpx.Response(200, json=items[(number - 1) * per_page:number * per_page], headers=headers)
+
+    files = [{"filename": f"f{i}.py", "sha": f"s{i}", "changes": i, "patch": "@@ ..."} for i in range(150)]
+    commits = [{"sha": f"c{i}", "commit": {"message": f"commit {i}"}} for i in range(120)]
+
+    async def handler(request):
+        path = request.url.path
+        if path.endswith("/files"):
+            return page(request, files)
+        if path.endswith("/commits"):
+            return page(request, commits)
+        if request.headers["Accept"].endswith("diff"):
+            return httpx.Response(200, text="diff --git a/f0.py b/f0.py\n")
+        return httpx.Response(200, json={"title": "t", "head": {"sha": "abc"}})
+
+    pr_data = await service(handler).fetch_pr_data("https://github.com/o/r/pull/7")
+    assert pr_data.files == [{"filename": f"f{i}.py", "sha": f"s{i}", "changes": i} for i in range(150)]
+    assert pr_data.commits == [f"commit {i}" for i in range(120)]
+    assert pr_data.head_sha == "abc"
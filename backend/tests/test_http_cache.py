@@ -0,0 +1,38 @@
+import pytest
+
+from app.services.http_cache import CachedResponse, MemoryResponseCache
+
+
+def response(size: int) -> CachedResponse:
+    return CachedResponse(etag='"x"', last_modified=None, content=b"x" * size)
+
+
+@pytest.mark.asyncio
+async def test_evicts_by_bytes():
+    cache = MemoryResponseCache(max_entries=100, max_bytes=1000, max_entry_bytes=1000)
+    for key in "abcd":
+        await cache.set(key, response(300))
+    assert await cache.get("a") is None
+    assert [key for key in "bcd" if await cache.get(key)] == ["b", "c", "d"]
+    assert cache.stats()["bytes"] == 900
+
+    await cache.get("b")  # Most recently used now
+    await cache.set("e", response(300))
+    assert await cache.get("c") is None and await cache.get("b") is not None
+
+
+@pytest.mark.asyncio
+async def test_skips_large_bodies():
+    cache = MemoryResponseCache(max_bytes=1000, max_entry_bytes=500)
+    await cache.set("a", response(100))
+    await cache.set("a", response(600))  # Replacement too large: the stale body goes too
+    assert await cache.get("a") is None
+    assert cache.stats()["bytes"] == 0 and cache.stats()["skipped"] == 1
+
+
+@pytest.mark.asyncio
+async def test_evicts_by_count():
+    cache = MemoryResponseCache(max_entries=2)
+    for key in "abc":
+        await cache.set(key, response(1))
+    assert len(cache) == 2 and await cache.get("a") is None
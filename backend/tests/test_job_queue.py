@@ -0,0 +1,104 @@
+from datetime import datetime, timedelta
+
+from app.models import AnalysisRun
+from app.models.analysis import AnalysisStatus
+from app.models.job import JobStatus
+from app.services.job_queue import JobQueue
+
+
+def test_claim_in_order_once(db, enqueue):
+    queue = JobQueue()
+    first, second = enqueue(queue), enqueue(queue)
+
+    claimed = queue.claim(db, "w1")
+    assert claimed.id == first.id
+    assert (claimed.status, claimed.locked_by, claimed.attempts) == (JobStatus.RUNNING, "w1", 1)
+    assert queue.claim(db, "w2").id == second.id
+    assert queue.claim(db, "w3") is None
+
+
+def test_fail_retries_then_gives_up(db, enqueue):
+    queue = JobQueue(max_attempts=2, retry_delay_seconds=0)
+    job = enqueue(queue)
+
+    job = queue.claim(db, "w1")
+    assert queue.fail(db, job, "boom") is True
+    assert (job.status, job.last_error, job.locked_by) == (JobStatus.QUEUED, "boom", None)
+
+    job = queue.claim(db, "w1")
+    assert job.attempts == 2
+    assert queue.fail(db, job, "boom again") is False
+    assert job.status == JobStatus.FAILED
+    assert queue.claim(db, "w1") is None
+
+
+def test_retry_waits_for_delay(db, enqueue):
+    queue = JobQueue(retry_delay_seconds=60)
+    enqueue(queue)
+    queue.fail(db, queue.claim(db, "w1"), "boom")
+    assert queue.claim(db, "w1") is None
+
+
+def test_release_does_not_count_attempt(db, enqueue):
+    queue = JobQueue()
+    enqueue(queue)
+    queue.release(db, queue.claim(db, "w1"))
+    assert queue.claim(db, "w2").attempts == 1
+
+
+def test_requeue_expired(db, enqueue):
+    queue = JobQueue(max_attempts=2, lease_seconds=60)
+    retried, exhausted = enqueue(queue), enqueue(queue)
+    queue.claim(db, "w1")
+    queue.claim(db, "w1")
+    exhausted.attempts = 2
+    stale = datetime.utcnow() - timedelta(seconds=120)
+    retried.locked_at = exhausted.locked_at = stale
+    db.commit()
+
+    assert queue.requeue_expired(db) == 1
+    db.expire_all()
+    assert (retried.status, retried.locked_by) == (JobStatus.QUEUED, None)
+    assert exhausted.status == JobStatus.FAILED
+    run = db.get(AnalysisRun, exhausted.run_id)
+    assert run.status == AnalysisStatus.FAILED
+    assert queue.claim(db, "w2").id == retried.id
+
+
+def test_live_lease_not_requeued(db, enqueue):
+    queue = JobQueue(lease_seconds=60)
+    enqueue(queue)
+    queue.claim(db, "w1")
+    assert queue.requeue_expired(db) == 0
+
+
+def test_heartbeat_renews_lease(db, enqueue):
+    queue = JobQueue(lease_seconds=60)
+    job = enqueue(queue)
+    job = queue.claim(db, "w1")
+    job.locked_at = datetime.utcnow() - timedelta(seconds=120)
+    db.commit()
+
+    assert queue.heartbeat(db, job) is True
+    assert queue.requeue_expired(db) == 0
+
+
+def test_expired_worker_cannot_touch_reclaimed_job(db, enqueue):
+    queue = JobQueue(lease_seconds=60)
+    enqueue(queue)
+    stale = queue.claim(db, "w1")
+    stale.locked_at = datetime.utcnow() - timedelta(seconds=120)
+    db.commit()
+    db.refresh(stale)
+    db.expunge(stale)  # The first worker keeps its own detached copy
+    queue.requeue_expired(db)
+    current = queue.claim(db, "w2")
+
+    assert queue.heartbeat(db, stale) is False
+    assert queue.complete(db, stale) is False
+    assert queue.fail(db, stale, "late") is False
+    queue.release(db, stale)
+
+    db.refresh(current)
+    assert (current.status, current.locked_by, current.attempts) == (JobStatus.RUNNING, "w2", 2)
+    assert queue.complete(db, current) is True
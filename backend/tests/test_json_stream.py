@@ -0,0 +1,45 @@
+import json
+import random
+
+from app.services.json_stream import JSONArrayStream
+
+
+DOCUMENT = json.dumps({
+    "pr_summary": {"findings": [{"not": "these"}], "text": "a \"quoted\" ] } [ {"},
+    "findings": [
+        {"title": "one", "evidence": "brace } and bracket ] in a string"},
+        {"title": "two", "nested": {"list": [1, {"deep": True}]}, "escaped": "\\\"\\\\"},
+        {"title": "three é"},
+    ],
+    "risk_matrix": {"security": "low"},
+}, indent=2)
+
+
+def test_whole_document():
+    stream = JSONArrayStream("findings")
+    assert stream.feed(DOCUMENT) == json.loads(DOCUMENT)["findings"]
+    assert stream.text == DOCUMENT
+
+
+def test_arbitrary_chunking():
+    expected = json.loads(DOCUMENT)["findings"]
+    rng = random.Random(0)
+    for _ in range(200):
+        stream = JSONArrayStream("findings")
+        found = []
+        pos = 0
+        while pos < len(DOCUMENT):
+            step = rng.randint(1, 12)
+            found.extend(stream.feed(DOCUMENT[pos:pos + step]))
+            pos += step
+        assert found == expected
+
+
+def test_one_character_at_a_time():
+    stream = JSONArrayStream("findings")
+    found = [element for c in DOCUMENT for element in stream.feed(c)]
+    assert [f["title"] for f in found] == ["one", "two", "three é"]
+
+
+def test_missing_key():
+    assert JSONArrayStream("findings").feed('{"other": [{"a": 1}]}') == []
@@ -0,0 +1,18 @@
+from datetime import datetime
+
+import pytest
+
+from app.services.pagination import decode_cursor, encode_cursor
+
+
+def test_round_trip():
+    created_at = datetime(2025, 1, 31, 23, 59, 59, 123456)
+    cursor = encode_cursor(created_at, 42)
+    assert "=" not in cursor
+    assert decode_cursor(cursor) == (created_at, 42)
+
+
+@pytest.mark.parametrize("cursor", ["", "not-a-cursor", "W10", encode_cursor(datetime(2025, 1, 1), 1)[:-3]])
+def test_malformed(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
@@ -0,0 +1,53 @@
+import asyncio
+import time
+
+import httpx
+import pytest
+
+from app.services.rate_limit import GitHubRateLimiter, RateLimitExceeded
+
+
+def low_budget(limiter: GitHubRateLimiter, remaining: int, reset_in: float):
+    budget = limiter.budget("token")
+    budget.remaining = remaining
+    budget.reset_at = time.time() + reset_in
+    return budget
+
+
+@pytest.mark.asyncio
+async def test_low_budget_is_paced_across_concurrent_requests():
+    limiter = GitHubRateLimiter(max_concurrency=10, reserve=50, max_wait=5)
+    low_budget(limiter, remaining=10, reset_in=1.0)  # One request per 0.1s
+    sent = []
+
+    async def request():
+        sent.append(time.monotonic())
+        return httpx.Response(200)
+
+    await asyncio.gather(*(limiter.send("token", request) for _ in range(5)))
+    gaps = [b - a for a, b in zip(sent, sent[1:])]
+    assert min(gaps) > 0.08
+
+
+@pytest.mark.asyncio
+async def test_pacing_beyond_max_wait_fails_fast():
+    limiter = GitHubRateLimiter(reserve=50, max_wait=0.15)
+    low_budget(limiter, remaining=10, reset_in=1.0)
+
+    async def request():
+        return httpx.Response(200)
+
+    results = await asyncio.gather(*(limiter.send("token", request) for _ in range(4)), return_exceptions=True)
+    assert [isinstance(r, RateLimitExceeded) for r in results] == [False, False, True, True]
+
+
+@pytest.mark.asyncio
+async def test_retries_transient_failures():
+    limiter = GitHubRateLimiter(max_retries=2, backoff=0.01)
+    statuses = iter([502, 503, 200])
+
+    async def request():
+        return httpx.Response(next(statuses))
+
+    assert (await limiter.send("token", request)).status_code == 200
+    assert limiter.budget("token").retries == 2
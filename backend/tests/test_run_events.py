@@ -0,0 +1,60 @@
+import asyncio
+
+import pytest
+
+import app.routers.analyze as analyze
+from app.models import AnalysisRun
+from app.models.analysis import AnalysisStatus
+from app.services.events import get_event_broker
+
+
+@pytest.mark.asyncio
+async def test_event_published_before_first_snapshot(db, monkeypatch):
+    run = AnalysisRun(status=AnalysisStatus.PROCESSING)
+    db.add(run)
+    db.commit()
+
+    read_snapshot = analyze._run_snapshot
+    calls = 0
+
+    async def snapshot_after_event(run_id):
+        nonlocal calls
+        calls += 1
+        if calls == 1:
+            # The worker publishes between subscribe() and the first read
+            await get_event_broker().publish(run_id, "stage", {"stage": "fetch", "seconds": 0.1})
+        return await read_snapshot(run_id)
+
+    monkeypatch.setattr(analyze, "_run_snapshot", snapshot_after_event)
+    events = analyze._run_events(run.id)
+    try:
+        first = await asyncio.wait_for(events.__anext__(), 2)
+        second = await asyncio.wait_for(events.__anext__(), 2)
+    finally:
+        await events.aclose()
+
+    assert first == ("status", {"status": "processing", "error_message": None})
+    assert second == ("stage", {"stage": "fetch", "seconds": 0.1})
+    assert calls == 1
+
+
+@pytest.mark.asyncio
+async def test_stream_ends_with_final_status(db):
+    run = AnalysisRun(status=AnalysisStatus.PROCESSING)
+    db.add(run)
+    db.commit()
+    broker = get_event_broker()
+
+    async def worker():
+        await asyncio.sleep(0.05)
+        await broker.publish(run.id, "finding", {"title": "t"})
+        await broker.publish(run.id, "status", {"status": "completed", "error_message": None})
+
+    task = asyncio.create_task(worker())
+    received = [item async for item in analyze._run_events(run.id)]
+    await task
+    assert received == [
+        ("status", {"status": "processing", "error_message": None}),
+        ("finding", {"title": "t"}),
+        ("status", {"status": "completed", "error_message": None}),
+    ]
@@ -0,0 +1,100 @@
+import random
+import re
+
+import pytest
+
+import app.services.analyzer as analyzer_module
+
+from app.services.analyzer import AnalyzerService
+from app.services.executors import get_scan_pool, shutdown_executors
+from app.services.scanner import PatternScanner, ScanRule
+
+
+SCANNER = AnalyzerService.SCANNER
+
+
+def naive_scan(rules: list[ScanRule], text: str) -> list[tuple[str, int, int, str]]:
+    """Each rule's finditer over each line, the behaviour the scanner replaces."""
+    matches = []
+    for rule in rules:
+        compiled = re.compile(rule.pattern, re.IGNORECASE)
+        found = []
+        pos = 0
+        for line in text.split("\n"):
+            for match in compiled.finditer(text, pos, pos + len(line)):
+                found.append((rule.pattern, match.start(), match.end(), match.group(0)))
+                if rule.first_only:
+                    break
+            if rule.first_only and found:
+                break
+            pos += len(line) + 1
+        matches.extend(found)
+    return matches
+
+
+def as_tuples(matches) -> list[tuple[str, int, int, str]]:
+    return [(m.rule.pattern, m.start, m.end, m.text) for m in matches]
+
+
+FRAGMENTS = [
+    "password = 'hunter2'", "API_KEY=abc", "eval(data)", "exec (code)",
+    "SELECT * FROM users WHERE id = " + "'+", "el.innerHTML = x", "dangerouslySetInnerHTML",
+    "subprocess.call(cmd, shell=True)", "pickle.loads(b)", "yaml.load(f)", "yaml.load(f, Loader=L)",
+    ".findAll(", ".find_all(", "for a in b: for c in d", "time.sleep(1)", "console.log(x)",
+    "print(y)", "@login_required", "auth_middleware", "JWT", "token.verify()", "role", "access control",
+    "TOKEN", "İstanbul", "plain text", "x = 1", "",
+]
+
+
+def test_matches_naive_scan_on_heuristic_rules():
+    rng = random.Random(0)
+    for _ in range(200):
+        text = "\n".join(
+            " ".join(rng.choice(FRAGMENTS) for _ in range(rng.randint(0, 3)))
+            for _ in range(rng.randint(1, 20))
+        )
+        assert as_tuples(SCANNER.scan(text)) == naive_scan(SCANNER.rules, text)
+
+
+def test_overlapping_and_short_literals():
+    rules = [
+        ScanRule(r"ab", "short literal, scanned directly", "x"),
+        ScanRule(r"abc\d", "prefix of another trigger", "x"),
+        ScanRule(r"abcdef", "longer trigger", "x"),
+        ScanRule(r"(foo|bar)baz", "branch", "x"),
+        ScanRule(r"\d+", "no literal", "x", first_only=True),
+    ]
+    scanner = PatternScanner(rules)
+    text = "abcdef abc1\nfoobaz BARBAZ 12\n34 ab"
+    assert as_tuples(scanner.scan(text)) == naive_scan(rules, text)
+
+
+def test_sharded_scan_merges_to_whole_scan():
+    text = "\n".join(FRAGMENTS * 5)
+    lines = text.split("\n")
+    shards, offset = [], 0
+    for i in range(0, len(lines), 7):
+        shard = "\n".join(lines[i:i + 7])
+        shards.append(SCANNER.scan_compact(shard, offset))
+        offset += len(shard) + 1
+    assert as_tuples(SCANNER.merge(shards)) == as_tuples(SCANNER.scan(text))
+
+
+@pytest.mark.asyncio
+async def test_process_pool_scan_matches_serial_scan(monkeypatch):
+    diff = "".join(
+        f"diff --git a/f{i}.py b/f{i}.py\n--- a/f{i}.py\n+++ b/f{i}.py\n@@ -0,0 +1,{len(FRAGMENTS)} @@\n"
+        + "".join(f"+{fragment}\n" for fragment in FRAGMENTS)
+        for i in range(20)
+    )
+    analyzer = AnalyzerService()
+    analyzer.settings = analyzer.settings.model_copy(update={"heuristic_scan_workers": 2, "heuristic_parallel_threshold": 0})
+    payload = analyzer.normalize_diff_payload(diff)
+    index = payload.diff_index
+    monkeypatch.setattr(analyzer_module, "get_findings_cache", lambda: None)
+    try:
+        pooled = await analyzer._scan_heuristics(payload)
+        assert get_scan_pool()._mp_context.get_start_method() != "fork"
+    finally:
+        shutdown_executors()
+    assert as_tuples(pooled) == as_tuples(SCANNER.scan(index.text))
@@ -0,0 +1,71 @@
+from sqlalchemy import create_engine, inspect, text
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+import pytest
+
+from app.models import AnalysisResult, AnalysisRun, init_db, upgrade_schema
+from app.services.blob_store import load_diff_text, load_result_json
+
+# Tables as created by the first release, before any columns were added
+BASELINE_SCHEMA = [
+    """CREATE TABLE users (
+        id INTEGER PRIMARY KEY, github_id INTEGER UNIQUE, username VARCHAR UNIQUE, email VARCHAR,
+        token_encrypted VARCHAR, avatar_url VARCHAR, created_at DATETIME, updated_at DATETIME)""",
+    """CREATE TABLE analysis_runs (
+        id INTEGER PRIMARY KEY, user_id INTEGER REFERENCES users (id), repo VARCHAR,
+        pr_number INTEGER, pr_url VARCHAR, diff_text TEXT, status VARCHAR, error_message TEXT,
+        created_at DATETIME, completed_at DATETIME)""",
+    "CREATE INDEX ix_analysis_runs_repo ON analysis_runs (repo)",
+    """CREATE TABLE analysis_results (
+        id INTEGER PRIMARY KEY, run_id INTEGER UNIQUE REFERENCES analysis_runs (id), result_json JSON,
+        model_version VARCHAR, rules_version VARCHAR, created_at DATETIME)""",
+    "INSERT INTO analysis_runs (id, diff_text, status) VALUES (1, 'diff --git a/x b/x', 'completed')",
+    """INSERT INTO analysis_results (id, run_id, result_json, model_version)
+        VALUES (1, 1, '{"review": {"findings": []}, "markdown": "ok"}', 'heuristics')""",
+]
+
+
+@pytest.fixture
+def baseline_engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/baseline.db")
+    with engine.begin() as conn:
+        for statement in BASELINE_SCHEMA:
+            conn.execute(text(statement))
+    yield engine
+    engine.dispose()
+
+
+def test_upgrades_baseline_database(baseline_engine):
+    init_db(baseline_engine)
+
+    columns = {c["name"] for c in inspect(baseline_engine).get_columns("analysis_runs")}
+    assert {"inflight_key", "head_sha", "options_hash", "partial_findings", "diff_blob"} <= columns
+    indexes = {i["name"] for i in inspect(baseline_engine).get_indexes("analysis_runs")}
+    assert {
+        "ix_analysis_runs_created_at_id",
+        "ix_analysis_runs_repo_created_at_id",
+        "ix_analysis_runs_status_created_at_id",
+    } <= indexes
+    columns = {c["name"] for c in inspect(baseline_engine).get_columns("analysis_results")}
+    assert {"cache_key", "cache_hit", "result_blob"} <= columns
+    indexes = {i["name"] for i in inspect(baseline_engine).get_indexes("analysis_results")}
+    assert "ix_analysis_results_cache_key" in indexes
+    assert upgrade_schema(baseline_engine) == []  # Nothing left to do
+
+    with Session(baseline_engine) as db:
+        run = db.get(AnalysisRun, 1)
+        assert load_diff_text(db, run) == "diff --git a/x b/x"
+        assert load_result_json(db, db.get(AnalysisResult, 1)) == {"review": {"findings": []}, "markdown": "ok"}
+
+        # The added unique column is still enforced
+        db.add_all([AnalysisRun(inflight_key="k"), AnalysisRun(inflight_key="k")])
+        with pytest.raises(IntegrityError):
+            db.commit()
+
+
+def test_fresh_database_needs_no_upgrade(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/fresh.db")
+    init_db(engine)
+    assert upgrade_schema(engine) == []
+    engine.dispose()
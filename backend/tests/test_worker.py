@@ -0,0 +1,107 @@
+import asyncio
+
+import pytest
+
+import app.worker as worker_module
+from app.models import AnalysisJob, AnalysisRun
+from app.models.analysis import AnalysisStatus
+from app.models.job import JobStatus
+from app.services.job_queue import JobQueue
+from app.services.events import get_event_broker
+from app.services.rate_limit import GitHubRateLimiter
+from app.schemas.analysis import Finding
+from app.worker import PartialFindings, Worker, _record_failure
+
+
+def make_worker(queue: JobQueue) -> Worker:
+    return Worker(client=None, cache=None, rate_limiter=GitHubRateLimiter(), queue=queue, concurrency=1, poll_interval=0.05)
+
+
+@pytest.mark.asyncio
+async def test_heartbeat_keeps_long_analysis_leased(db, enqueue, monkeypatch):
+    queue = JobQueue(lease_seconds=0.3)
+    job = enqueue(queue)
+
+    async def slow_analysis(*args, **kwargs):
+        for _ in range(10):
+            await asyncio.sleep(0.1)
+            assert await asyncio.to_thread(queue.requeue_expired, worker_module.SessionLocal()) == 0
+
+    monkeypatch.setattr(worker_module, "run_analysis", slow_analysis)
+    worker = make_worker(queue)
+    claimed = await worker_module.run_db_write(worker._claim)
+    await worker._process(claimed)
+
+    db.refresh(job)
+    assert (job.status, job.attempts) == (JobStatus.DONE, 1)
+
+
+@pytest.mark.asyncio
+async def test_lost_lease_abandons_analysis(db, enqueue, monkeypatch):
+    queue = JobQueue(lease_seconds=0.3)
+    job = enqueue(queue)
+    finished = False
+
+    async def slow_analysis(*args, **kwargs):
+        nonlocal finished
+        await asyncio.sleep(5)
+        finished = True
+
+    monkeypatch.setattr(worker_module, "run_analysis", slow_analysis)
+    worker = make_worker(queue)
+    claimed = await worker_module.run_db_write(worker._claim)
+    # Another worker takes the job over
+    db.query(AnalysisJob).update({"locked_by": "other"})
+    db.commit()
+
+    await asyncio.wait_for(worker._process(claimed), 2)
+    db.refresh(job)
+    assert not finished
+    assert (job.status, job.locked_by) == (JobStatus.RUNNING, "other")
+
+
+def test_failure_does_not_undo_completed_run(db):
+    run = AnalysisRun(status=AnalysisStatus.COMPLETED)
+    db.add(run)
+    db.commit()
+    assert _record_failure(db, run.id, "late duplicate", final_attempt=True) is None
+    assert run.status == AnalysisStatus.COMPLETED
+
+
+@pytest.mark.asyncio
+async def test_partial_findings_flushed_after_interval(db):
+    run = AnalysisRun(status=AnalysisStatus.PROCESSING)
+    db.add(run)
+    db.commit()
+    partial = PartialFindings(run.id, interval=0.2)
+    for title in ("a", "b", "c"):
+        await partial.add(Finding(title=title, severity="low", confidence=0.5, file="x.py", evidence="e", recommendation="r"))
+
+    db.refresh(run)
+    assert [f["title"] for f in run.partial_findings] == ["a"]  # Saved right away
+    await asyncio.sleep(0.3)
+    db.refresh(run)
+    assert [f["title"] for f in run.partial_findings] == ["a", "b", "c"]
+
+
+@pytest.mark.asyncio
+async def test_partial_findings_deduplicated_and_reset(db, monkeypatch):
+    run = AnalysisRun(status=AnalysisStatus.PROCESSING)
+    db.add(run)
+    db.commit()
+    published = []
+
+    async def publish(run_id, event, data):
+        published.append(event)
+
+    monkeypatch.setattr(get_event_broker(), "publish", publish)
+    partial = PartialFindings(run.id, interval=0)
+    for title in ("a", "a", "b"):
+        await partial.add(Finding(title=title, severity="low", confidence=0.5, file="x.py", line_number=1, evidence="e", recommendation="r"))
+    db.refresh(run)
+    assert [f["title"] for f in run.partial_findings] == ["a", "b"]
+
+    await partial.reset()
+    db.refresh(run)
+    assert run.partial_findings == []
+    assert published == ["finding", "finding", "findings_reset"]
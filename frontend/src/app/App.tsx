@@ -75,6 +75,52 @@ function App() {
   const [isAnalyzing, setIsAnalyzing] = useState(false);
   const [statusMessage, setStatusMessage] = useState<string | null>(null);
 
+  // Follow the run's event stream until it finishes. Resolves false if the
+  // stream is unavailable, so the caller can fall back to polling.
+  const waitForRun = (runId: number): Promise<boolean> =>
+    new Promise((resolve, reject) => {
+      if (typeof EventSource === "undefined") {
+        resolve(false);
+        return;
+      }
+      const source = new EventSource(
+        `${API_BASE_URL.replace(/\/$/, "")}/api/runs/${runId}/events`
+      );
+      let findings = 0;
+      source.addEventListener("status", (event) => {
+        const data = JSON.parse((event as MessageEvent).data) as {
+          status: RunStatus;
+          error_message?: string | null;
+        };
+        if (data.status === "completed") {
+          source.close();
+          resolve(true);
+        } else if (data.status === "failed") {
+          source.close();
+          reject(new Error(data.error_message || "Analysis failed"));
+        } else if (data.status === "processing") {
+          findings = 0;
+          setStatusMessage("Analysis in progress...");
+        }
+      });
+      source.addEventListener("findings_reset", () => {
+        findings = 0;
+        setStatusMessage("Analysis in progress...");
+      });
+      source.addEventListener("finding", () => {
+        findings += 1;
+        setStatusMessage(
+          `Analysis in progress... ${findings} finding${
+            findings === 1 ? "" : "s"
+          } so far`
+        );
+      });
+      source.onerror = () => {
+        source.close();
+        resolve(false);
+      };
+    });
+
   const pollForResult = async (runId: number): Promise<AnalysisResult> => {
     const maxAttempts = 45; // ~90s at 2s interval
     for (let attempt = 0; attempt < maxAttempts; attempt += 1) {
@@ -153,6 +199,7 @@ function App() {
       const analyzeData = data as AnalyzeResponse;
       setStatusMessage("Analysis started. Waiting for results...");
 
+      await waitForRun(analyzeData.run_id);
       const result = await pollForResult(analyzeData.run_id);
       setAnalysisResult(result);
       setCurrentView("results");